@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 import dj_database_url
 import json
@@ -46,6 +47,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware", # Whitenoise should be second
+    # Times SQL, Drive and template work per request (static files above are not timed).
+    'core.middleware.PerformanceMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,7 +62,8 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with per-request render timing (see core.metrics).
+        'BACKEND': 'core.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'core' / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,6 +87,54 @@ DATABASES = {
         conn_max_age=600
     )
 }
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # SQLite test databases default to shared-cache memory, which fails lock
+    # conflicts at once; a file waits on them like the real database, so the
+    # concurrency tests can run.
+    DATABASES['default'].setdefault('TEST', {'NAME': str(BASE_DIR / 'test_db.sqlite3')})
+
+# --- Cache ---
+# CACHE_BACKEND picks the tier: 'locmem' (per worker process, the default),
+# 'file' (shared by workers on one host, under CACHE_DIR) or 'redis'
+# (shared by every host, at CACHE_URL). Test runs pick theirs the same way,
+# e.g. CACHE_BACKEND=locmem.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem').lower()
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '10000'))
+if CACHE_BACKEND == 'redis':
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured("CACHE_BACKEND=redis needs the redis package (pip install -r requirements.txt).")
+
+if CACHE_BACKEND == 'redis':
+    _default_cache = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_URL', 'redis://127.0.0.1:6379/0'),
+    }
+elif CACHE_BACKEND == 'file':
+    _default_cache = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', str(BASE_DIR / '.cache')),
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    }
+else:
+    _default_cache = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'smrutishare',
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    }
+CACHES = {'default': _default_cache}
+
+# With a shared cache, sessions are read from it and written through to the
+# database. A per-worker locmem cache would keep serving a session another
+# worker has logged out, so sessions then come straight from the database.
+if CACHE_BACKEND in ('redis', 'file'):
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# SiteSetting.load() is invalidated on save; the TTL bounds staleness in
+# other worker processes when the cache is not shared (locmem).
+SITE_SETTINGS_CACHE_TTL = int(os.getenv('SITE_SETTINGS_CACHE_TTL', '300'))
 
 # --- Password Validation ---
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -109,41 +161,97 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 # --- Media Files ---
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / '.media'
+# Uploads are stored once per distinct content under MEDIA_ROOT/blobs/xx/<sha256>.ext.
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+# Media is served by core.views.serve_media to its owner (or staff). Content-hashed
+# names are cached by browsers for MEDIA_CACHE_MAX_AGE seconds without revalidating.
+MEDIA_CACHE_MAX_AGE = int(os.getenv('MEDIA_CACHE_MAX_AGE', str(365 * 24 * 3600)))
+# Behind nginx set X-Accel-Redirect (with an internal location at MEDIA_SENDFILE_PREFIX
+# aliased to MEDIA_ROOT); behind Apache mod_xsendfile set X-Sendfile. Empty: Django streams.
+MEDIA_SENDFILE_HEADER = os.getenv('MEDIA_SENDFILE_HEADER', '')
+MEDIA_SENDFILE_PREFIX = os.getenv('MEDIA_SENDFILE_PREFIX', '/protected-media/')
+
+# Resized JPEG/WebP variants, stored under MEDIA_ROOT/thumbs/ keyed by content hash.
+THUMBNAIL_SIZES = {
+    'small': (80, 80),
+    'card': (480, 480),
+}
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '82'))
+# Rendered PDF receipts and batch reports, named by the request's updated_at.
+RECEIPT_CACHE_DIR = Path(os.getenv('RECEIPT_CACHE_DIR', BASE_DIR / '.cache' / 'receipts'))
+RECEIPT_WORKERS = int(os.getenv('RECEIPT_WORKERS', '0')) or None
 
 # --- App Specific Settings ---
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'core.User'
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    # Subclasses ModelBackend; handles username and phone logins in one query.
     'core.auth_backend.PhoneOrUsernameBackend',
 ]
 
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
+DASHBOARD_PAGE_SIZE = int(os.getenv('DASHBOARD_PAGE_SIZE', '20'))
+# The dashboard polls /api/requests/ (conditional GET) this often; 0 turns polling off.
+DASHBOARD_POLL_SECONDS = int(os.getenv('DASHBOARD_POLL_SECONDS', '30'))
+STATUS_API_MAX_LIMIT = int(os.getenv('STATUS_API_MAX_LIMIT', '100'))
 
-# --- Google Drive Config ---
-# settings.py
-import json
+# --- Performance instrumentation ---
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'True').lower() == 'true'
+SLOW_REQUEST_THRESHOLD_MS = int(os.getenv('SLOW_REQUEST_THRESHOLD_MS', '1000'))
+# Lets a Prometheus scraper read /metrics with "Authorization: Bearer <token>" instead of a staff login.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# --- Admin ---
+# Unfiltered changelists above this many rows show Postgres' estimated count.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv('ADMIN_ESTIMATED_COUNT_THRESHOLD', '100000'))
+ADMIN_ACTION_BATCH_SIZE = int(os.getenv('ADMIN_ACTION_BATCH_SIZE', '1000'))
+# Rows fetched per round trip by the CSV/XLSX exports.
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+# Rows validated and bulk-inserted together by the spreadsheet import.
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '2000'))
+
+# --- Drive folder index ---
+# Folder listings are cached as {stem: {id, name}} dicts in the Django cache.
+DRIVE_INDEX_TTL = int(os.getenv('DRIVE_INDEX_TTL', '300'))
+DRIVE_INDEX_MAX_FOLDERS = int(os.getenv('DRIVE_INDEX_MAX_FOLDERS', '32'))
+# When the `sync_drive_changes` daemon runs, result links are read from the
+# database only and the folder index is never consulted.
+DRIVE_RESULTS_FROM_SYNC = os.getenv('DRIVE_RESULTS_FROM_SYNC', 'False').lower() == 'true'
 
 # --- Google Drive Config ---
-# This code correctly reads the credentials from the environment variable.
+# The service-account JSON is only parsed here; core.google_drive.get_credentials()
+# builds the credentials object (and imports the Google client) on first Drive use.
 GDRIVE_CREDENTIALS_JSON_STRING = os.getenv('GDRIVE_SERVICE_ACCOUNT_FILE', '')
+GOOGLE_DRIVE_SCOPES = ['https://www.googleapis.com/auth/drive.file']
 
 if GDRIVE_CREDENTIALS_JSON_STRING:
     try:
-        # Load the JSON string into a Python dictionary
-        gdrive_credentials_dict = json.loads(GDRIVE_CREDENTIALS_JSON_STRING)
-
-        from google.oauth2 import service_account
-        # Use from_service_account_info(), which accepts a dictionary
-        GOOGLE_DRIVE_CREDENTIALS = service_account.Credentials.from_service_account_info(
-            gdrive_credentials_dict,
-            scopes=['https://www.googleapis.com/auth/drive.file']
-        )
+        GOOGLE_DRIVE_CREDENTIALS_INFO = json.loads(GDRIVE_CREDENTIALS_JSON_STRING)
     except json.JSONDecodeError:
         # Handle cases where the env var is not valid JSON
-        GOOGLE_DRIVE_CREDENTIALS = None
+        GOOGLE_DRIVE_CREDENTIALS_INFO = None
         print("WARNING: Could not decode GDRIVE_SERVICE_ACCOUNT_FILE JSON string.")
 else:
-    GOOGLE_DRIVE_CREDENTIALS = None
\ No newline at end of file
+    GOOGLE_DRIVE_CREDENTIALS_INFO = None
+# Authorized Drive clients are pooled per process (one per concurrent thread).
+DRIVE_SERVICE_POOL_SIZE = int(os.getenv('DRIVE_SERVICE_POOL_SIZE', '4'))
+DRIVE_HTTP_TIMEOUT = int(os.getenv('DRIVE_HTTP_TIMEOUT', '60'))
+# Resumable uploads are streamed in chunks of this size (rounded to 256 KiB).
+DRIVE_UPLOAD_CHUNK_SIZE = int(os.getenv('DRIVE_UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+DRIVE_UPLOAD_RETRIES = int(os.getenv('DRIVE_UPLOAD_RETRIES', '5'))
+# When False, reference images are streamed straight from the request to Drive
+# during request_create and no copy is written to MEDIA_ROOT.
+KEEP_LOCAL_REFERENCE_IMAGES = os.getenv('KEEP_LOCAL_REFERENCE_IMAGES', 'True').lower() == 'true'
+
+# Uploads to Drive are queued and drained by `manage.py drain_uploads`.
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '4'))
+UPLOAD_MAX_ATTEMPTS = int(os.getenv('UPLOAD_MAX_ATTEMPTS', '8'))
+UPLOAD_RETRY_BASE_SECONDS = int(os.getenv('UPLOAD_RETRY_BASE_SECONDS', '30'))
+UPLOAD_RETRY_MAX_SECONDS = int(os.getenv('UPLOAD_RETRY_MAX_SECONDS', '3600'))
+UPLOAD_STALE_SECONDS = int(os.getenv('UPLOAD_STALE_SECONDS', '900'))
+
+# Fallback Drive folders when SiteSetting leaves them blank.
+GDRIVE_PROFILE_FOLDER_ID = os.getenv('GDRIVE_PROFILE_FOLDER_ID', '')
+GDRIVE_REFERENCE_FOLDER_ID = os.getenv('GDRIVE_REFERENCE_FOLDER_ID', '')
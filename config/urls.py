@@ -1,13 +1,13 @@
 
+import re
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from core.views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('core.urls')),
+    # Media goes through an authorizing view in every environment (not only DEBUG).
+    re_path(r'^%s(?P<name>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,11 +1,17 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.http import FileResponse
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import User, SiteSetting, MediaRequest
+from . import drive_index, exports, google_drive, receipts
+from .paginators import EstimatedCountPaginator
+from .thumbnails import get_thumbnail_url
+from .models import User, SiteSetting, MediaRequest, DriveUploadJob
 
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('username', 'email', 'primary_phone', 'primary_type', 'is_satsangi', 'is_ambrish')
+    list_display = ('avatar', 'username', 'email', 'primary_phone', 'primary_type', 'is_satsangi', 'is_ambrish')
     readonly_fields = ('profile_preview',)
     fieldsets = (
         (None, {
@@ -28,17 +34,32 @@ class UserAdmin(admin.ModelAdmin):
         }),
     )
     search_fields = ('username', 'email', 'primary_phone')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def _thumbnail_html(self, obj, px):
+        jpeg = get_thumbnail_url(obj.profile_picture, 'small')
+        if not jpeg:
+            return None
+        return format_html(
+            '<picture><source srcset="{}" type="image/webp">'
+            '<img src="{}" loading="lazy" style="width:{}px;height:{}px;object-fit:cover;border-radius:8px;" /></picture>',
+            get_thumbnail_url(obj.profile_picture, 'small', 'webp'), jpeg, px, px
+        )
 
     def profile_preview(self, obj):
-        if obj.profile_picture:
-            return format_html('<img src="{}" style="width:80px;height:80px;border-radius:8px;" />', obj.profile_picture.url)
-        return 'No Image'
+        return self._thumbnail_html(obj, 80) or 'No Image'
     profile_preview.short_description = 'Profile Picture'
 
+    def avatar(self, obj):
+        return self._thumbnail_html(obj, 40) or '-'
+    avatar.short_description = ''
+
 
 @admin.register(SiteSetting)
 class SiteSettingAdmin(admin.ModelAdmin):
-    list_display = ('drive_profile_folder', 'drive_reference_folder', 'drive_data_folder')
+    list_display = ('drive_profile_folder', 'drive_reference_folder', 'drive_data_folder', 'shard_data_folder',
+                    'drive_archive_folder')
 
 
 @admin.register(MediaRequest)
@@ -51,22 +72,126 @@ class MediaRequestAdmin(admin.ModelAdmin):
         'time',
         'location',
         'status',
+        'result_file_link',
         'send_whatsapp_button',
     )
     readonly_fields = (
         'request_number',
         'reference_image_drive_id',
+        'result_file_id',
+        'result_file_name',
         'created_at',
         'updated_at',
         'send_whatsapp_button',
     )
-    actions = ['mark_resolved']
+    list_select_related = ('user',)
+    # created_at's range filter (today / past 7 days / this month / this year) hits the index;
+    # date_hierarchy would run a DISTINCT date-truncation scan over the whole table.
+    list_filter = ('status', 'created_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['mark_resolved', 'resolve_and_archive', 'resolve_and_share', 'export_csv', 'export_xlsx',
+               'receipts_report']
 
     def mark_resolved(self, request, queryset):
-        updated = queryset.update(status='resolved')
+        updated = self._resolve(queryset)
         self.message_user(request, f"{updated} request(s) marked resolved.")
     mark_resolved.short_description = 'Resolve selected requests'
 
+    def resolve_and_archive(self, request, queryset):
+        site_settings = SiteSetting.load()
+        archive_id = google_drive.extract_folder_id(site_settings.drive_archive_folder) if site_settings else None
+        if not archive_id:
+            self.message_user(request, 'Set a Drive archive folder in Site Settings first.', messages.ERROR)
+            return
+        # Look the files up before resolving: the selection may be filtered on status.
+        found = list(self._drive_results(queryset))
+        updated = self._resolve(queryset)
+        sources = {}
+        for r, f in found:
+            # A file may still sit in the flat folder while sharding is being rolled out.
+            sources[f['id']] = ','.join(filter(None, {google_drive.extract_folder_id(site_settings.drive_data_folder),
+                                                      site_settings.data_folder_for(r.request_number)}))
+        results = google_drive.move_files({file_id: (source, archive_id) for file_id, source in sources.items()})
+        # Archived files leave the data folder, so keep their link on the row instead of relying on the index.
+        archived = []
+        for r, f in found:
+            if results[f['id']][1] is None:
+                r.result_file_id, r.result_file_name, r.updated_at = f['id'], f['name'], timezone.now()
+                archived.append(r)
+        MediaRequest.objects.bulk_update(archived, ['result_file_id', 'result_file_name', 'updated_at'],
+                                         batch_size=settings.ADMIN_ACTION_BATCH_SIZE)
+        for folder_ids in set(sources.values()):
+            for folder_id in folder_ids.split(','):
+                drive_index.invalidate_folder_index(folder_id)
+        self._report_drive(request, updated, 'archived', results)
+    resolve_and_archive.short_description = 'Resolve selected requests and archive their Drive results'
+
+    def resolve_and_share(self, request, queryset):
+        file_ids = {f['id'] for _, f in self._drive_results(queryset)}
+        updated = self._resolve(queryset)
+        results = google_drive.share_files(file_ids)
+        self._report_drive(request, updated, 'shared (anyone with the link)', results)
+    resolve_and_share.short_description = 'Resolve selected requests and share their Drive results'
+
+    def _report_drive(self, request, updated, verb, results):
+        failed = {file_id: error for file_id, (_, error) in results.items() if error is not None}
+        self.message_user(request, f"{updated} request(s) marked resolved; {len(results) - len(failed)} Drive "
+                                   f"file(s) {verb}.")
+        if failed:
+            sample = '; '.join(f"{file_id}: {error}" for file_id, error in list(failed.items())[:5])
+            self.message_user(request, f"{len(failed)} Drive file(s) failed: {sample}", messages.WARNING)
+
+    def _drive_results(self, queryset):
+        """Yield (request, result file dict) for selected requests with a file on Drive, in bounded batches."""
+        batch_size = settings.ADMIN_ACTION_BATCH_SIZE
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                break
+            yield from ((r, f) for r, f in MediaRequest.with_drive_files(batch) if f)
+            last_pk = batch[-1].pk
+
+    def _resolve(self, queryset):
+        # Walk the selection by primary key in bounded batches so "select all"
+        # on a large table never holds one huge UPDATE or lock.
+        pending = queryset.exclude(status='resolved').order_by('pk').values_list('pk', flat=True)
+        batch_size = settings.ADMIN_ACTION_BATCH_SIZE
+        updated = 0
+        last_pk = 0
+        while True:
+            pks = list(pending.filter(pk__gt=last_pk)[:batch_size])
+            if not pks:
+                break
+            batch = MediaRequest.objects.filter(pk__in=pks)
+            updated += batch.update(status='resolved', updated_at=timezone.now())
+            last_pk = pks[-1]
+        return updated
+
+    def export_csv(self, request, queryset):
+        return exports.csv_response(queryset)
+    export_csv.short_description = 'Export selected requests to CSV'
+
+    def export_xlsx(self, request, queryset):
+        return exports.xlsx_response(queryset)
+    export_xlsx.short_description = 'Export selected requests to XLSX'
+
+    def receipts_report(self, request, queryset):
+        # Rendered inline: a process pool must not be forked inside a web worker.
+        # Large ranges belong to `manage.py render_receipts --report`.
+        path = receipts.batch_report(queryset, 'Selected requests', workers=1)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename='receipts.pdf',
+                            content_type='application/pdf')
+    receipts_report.short_description = 'Download receipts for selected requests (PDF)'
+
+    def result_file_link(self, obj):
+        """Link to the result file recorded by the Drive sync (no Drive call)."""
+        if not obj.result_file_id:
+            return '-'
+        return format_html('<a href="{}" target="_blank">{}</a>', obj.drive_view_link(obj.result_file_id), obj.result_file_name)
+    result_file_link.short_description = 'Result file'
+
     def send_whatsapp_button(self, obj):
         """Render a clickable WhatsApp button in admin."""
         if not obj or not obj.user or not obj.user.primary_phone:
@@ -88,3 +213,16 @@ class MediaRequestAdmin(admin.ModelAdmin):
             whatsapp_url
         )
     send_whatsapp_button.short_description = "WhatsApp"
+
+
+@admin.register(DriveUploadJob)
+class DriveUploadJobAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'target', 'status', 'attempts', 'next_attempt_at', 'drive_file_id')
+    list_filter = ('status', 'target')
+    readonly_fields = ('idempotency_key', 'drive_file_id', 'last_error', 'created_at', 'updated_at')
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='done').update(status='pending', next_attempt_at=timezone.now())
+        self.message_user(request, f"{updated} upload(s) queued for retry.")
+    retry_now.short_description = 'Retry selected uploads now'
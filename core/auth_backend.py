@@ -1,18 +1,47 @@
-
+import re
 from django.contrib.auth.backends import ModelBackend
+from django.db.models import Case, Q, Value, When
 from .models import User
 
+PHONE_SEPARATORS_RE = re.compile(r'[\s\-().]')
+
+
+def normalize_phone(value):
+    """Strip spaces, dashes, dots and brackets and turn a leading 00 into +."""
+    phone = PHONE_SEPARATORS_RE.sub('', value)
+    if phone.startswith('00'):
+        phone = '+' + phone[2:]
+    return phone
+
+
 class PhoneOrUsernameBackend(ModelBackend):
+    """Authenticate by username or primary phone with one query and one password hash.
+
+    Used as the only backend: it inherits ModelBackend's permission checks, so
+    listing ModelBackend as well would only add a second lookup and a second
+    (dummy) hash to every phone-number login.
+    """
+
     def authenticate(self, request, username=None, password=None, **kwargs):
         if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        # Phones may be stored with or without the leading +.
+        phone = normalize_phone(username).lstrip('+')
+        user = (
+            User._default_manager
+            .filter(Q(username=username) | Q(primary_phone__in=[phone, f'+{phone}']))
+            .order_by(Case(When(username=username, then=Value(0)), default=Value(1)), 'pk')
+            .first()
+        )
+        if user is None:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user (#20760).
+            User().set_password(password)
             return None
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            try:
-                user = User.objects.get(primary_phone=username)
-            except User.DoesNotExist:
-                return None
+        # check_password() re-hashes and saves the password when the hasher is outdated.
         if user.check_password(password) and self.user_can_authenticate(user):
             return user
         return None
@@ -0,0 +1,117 @@
+# core/drive_index.py
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from core.google_drive import iter_files_in_folder
+
+INDEX_KEY = "drive_index:folder:{folder_id}:{version}"
+VERSION_KEY = "drive_index:version:{folder_id}"
+FOLDERS_KEY = "drive_index:folders"
+
+# Per-process copies of folder indexes, keyed by folder id and holding
+# (version, index). A lookup costs one small cache read for the version;
+# the index itself is unpickled once per version, not on every call.
+_local = OrderedDict()
+_local_lock = threading.Lock()
+# Hit/miss counters for this process only, so lookups never pay a cache round-trip for them.
+_counts = {"hits": 0, "misses": 0}
+
+
+def _index_key(folder_id: str, version: str) -> str:
+    return INDEX_KEY.format(folder_id=folder_id, version=version)
+
+
+def _version_key(folder_id: str) -> str:
+    return VERSION_KEY.format(folder_id=folder_id)
+
+
+def _remember_folder(folder_id: str) -> None:
+    """Track indexed folders and evict the oldest ones past the size bound."""
+    folders = [f for f in cache.get(FOLDERS_KEY, []) if f != folder_id]
+    folders.append(folder_id)
+    max_folders = settings.DRIVE_INDEX_MAX_FOLDERS
+    while len(folders) > max_folders:
+        cache.delete(_version_key(folders.pop(0)))
+    cache.set(FOLDERS_KEY, folders, timeout=None)
+
+
+def _remember_local(folder_id: str, version: str, index: dict) -> None:
+    with _local_lock:
+        _local[folder_id] = (version, index)
+        _local.move_to_end(folder_id)
+        while len(_local) > settings.DRIVE_INDEX_MAX_FOLDERS:
+            _local.popitem(last=False)
+
+
+def build_index(files) -> dict:
+    """Map file stems (name without extension) to {"id", "name"}."""
+    index = {}
+    for f in files:
+        stem, _ = os.path.splitext(f["name"])
+        index.setdefault(stem, {"id": f["id"], "name": f["name"]})
+    return index
+
+
+def index_version(index: dict) -> str:
+    """Content hash of an index: relisting an unchanged folder yields the same version."""
+    digest = hashlib.sha1()
+    for stem in sorted(index):
+        digest.update(f"{stem}\0{index[stem]['id']}\0{index[stem]['name']}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def _load(folder_id: str):
+    """Return (version, index) for a folder, listing it on Drive only on a miss.
+
+    Listing errors propagate, so a failed listing is never cached as empty.
+    """
+    version = cache.get(_version_key(folder_id))
+    if version is not None:
+        local = _local.get(folder_id)
+        if local and local[0] == version:
+            _counts["hits"] += 1
+            return local
+        index = cache.get(_index_key(folder_id, version))
+        if index is not None:
+            _counts["hits"] += 1
+            _remember_local(folder_id, version, index)
+            return version, index
+
+    _counts["misses"] += 1
+    index = build_index(iter_files_in_folder(folder_id))
+    version = index_version(index)
+    # Write the index before publishing its version so readers never see a version without one.
+    cache.set(_index_key(folder_id, version), index, timeout=settings.DRIVE_INDEX_TTL * 2)
+    cache.set(_version_key(folder_id), version, timeout=settings.DRIVE_INDEX_TTL)
+    _remember_folder(folder_id)
+    _remember_local(folder_id, version, index)
+    return version, index
+
+
+def get_folder_index(folder_id: str) -> dict:
+    """Return the stem index for a folder (see _load); callers must not mutate it."""
+    return _load(folder_id)[1]
+
+
+def folder_version(folder_id: str) -> str:
+    """Return the version of a folder's index; it changes when the folder's listing does."""
+    return _load(folder_id)[0]
+
+
+def invalidate_folder_index(folder_id: str) -> None:
+    """Drop a folder's index so the next lookup lists it again."""
+    if folder_id:
+        cache.delete(_version_key(folder_id))
+
+
+def index_stats() -> dict:
+    """Return this process's hit/miss counters and the folders currently indexed."""
+    return {
+        "hits": _counts["hits"],
+        "misses": _counts["misses"],
+        "folders": cache.get(FOLDERS_KEY, []),
+    }
@@ -0,0 +1,103 @@
+# core/drive_shards.py
+
+import re
+import time
+from django.conf import settings
+from django.core.cache import cache
+from core.google_drive import create_folder, find_folder, iter_files_in_folder
+
+# Request numbers start with their creation date (YYYYMMDD_HHMM_0001), so a
+# result file's shard is known without asking Drive: <data folder>/YYYY/MM.
+SHARD_RE = re.compile(r"^(\d{4})(0[1-9]|1[0-2])\d{2}_")
+SHARD_KEY = "drive_shards:{root_id}:{path}"
+ALL_SHARDS_KEY = "drive_shards:{root_id}:*"
+CREATE_LOCK_KEY = "drive_shards:lock:{parent_id}:{name}"
+CREATE_LOCK_TIMEOUT = 30
+MISSING = ""
+
+
+def shard_name(request_number) -> str | None:
+    """Return the "YYYY/MM" shard a request number belongs to, or None if it carries no date."""
+    match = SHARD_RE.match(str(request_number or ""))
+    return f"{match.group(1)}/{match.group(2)}" if match else None
+
+
+def _key(root_id: str, path: str) -> str:
+    return SHARD_KEY.format(root_id=root_id, path=path)
+
+
+def _create_once(parent_id: str, name: str) -> str:
+    """Create a subfolder unless another worker is already doing so; Drive happily allows duplicate names."""
+    lock = CREATE_LOCK_KEY.format(parent_id=parent_id, name=name)
+    deadline = time.monotonic() + CREATE_LOCK_TIMEOUT
+    while True:
+        if cache.add(lock, 1, timeout=CREATE_LOCK_TIMEOUT):
+            try:
+                return find_folder(parent_id, name) or create_folder(parent_id, name)
+            finally:
+                cache.delete(lock)
+        time.sleep(0.5)
+        folder_id = find_folder(parent_id, name)
+        if folder_id or time.monotonic() > deadline:
+            return folder_id or create_folder(parent_id, name)
+
+
+def shard_folder_id(root_id: str, path: str, create: bool = False) -> str | None:
+    """Return the folder id for ``path`` ("YYYY" or "YYYY/MM") under the data folder.
+
+    Ids are cached without expiry (a folder's id never changes); a missing
+    shard is remembered for DRIVE_INDEX_TTL unless ``create`` is set, in
+    which case the missing levels are created.
+    """
+    key = _key(root_id, path)
+    cached = cache.get(key)
+    if cached or (cached == MISSING and not create):
+        return cached or None
+
+    parent_path, _, name = path.rpartition("/")
+    parent_id = shard_folder_id(root_id, parent_path, create) if parent_path else root_id
+    folder_id = find_folder(parent_id, name) if parent_id else None
+    if folder_id is None and parent_id and create:
+        folder_id = _create_once(parent_id, name)
+    if folder_id:
+        cache.set(key, folder_id, timeout=None)
+        cache.delete(ALL_SHARDS_KEY.format(root_id=root_id))
+    else:
+        cache.set(key, MISSING, timeout=settings.DRIVE_INDEX_TTL)
+    return folder_id
+
+
+def shard_folders(root_id: str) -> dict:
+    """Return {"YYYY/MM": folder_id} for every month shard under the data folder.
+
+    One listing for the year folders plus one per year, cached for
+    DRIVE_INDEX_TTL; each id found also warms the per-shard cache.
+    """
+    key = ALL_SHARDS_KEY.format(root_id=root_id)
+    shards = cache.get(key)
+    if shards is not None:
+        return shards
+
+    shards = {}
+    found = {}
+    for year in iter_files_in_folder(root_id, fields="id,name", folders=True):
+        if not re.fullmatch(r"\d{4}", year["name"]):
+            continue
+        found[year["name"]] = year["id"]
+        for month in iter_files_in_folder(year["id"], fields="id,name", folders=True):
+            path = f"{year['name']}/{month['name']}"
+            if re.fullmatch(r"\d{4}/(0[1-9]|1[0-2])", path):
+                shards[path] = found[path] = month["id"]
+    cache.set_many({_key(root_id, path): folder_id for path, folder_id in found.items()}, timeout=None)
+    cache.set(key, shards, timeout=settings.DRIVE_INDEX_TTL)
+    return shards
+
+
+def forget_folder(root_id: str, folder_id: str, name: str = "") -> None:
+    """Drop cached shard state touched by a folder being created, renamed, moved or removed."""
+    shards = cache.get(ALL_SHARDS_KEY.format(root_id=root_id)) or {}
+    paths = {path for path, shard_id in shards.items() if shard_id == folder_id}
+    if name:
+        paths |= {name} | {f"{path.split('/')[0]}/{name}" for path in shards}
+    if paths:
+        cache.delete_many([_key(root_id, path) for path in paths] + [ALL_SHARDS_KEY.format(root_id=root_id)])
@@ -0,0 +1,157 @@
+# core/drive_sync.py
+
+import os
+import re
+from django.utils import timezone
+from core import drive_shards
+from core.google_drive import (
+    FOLDER_MIMETYPE, extract_folder_id, get_start_page_token, iter_files_in_folder, list_changes,
+)
+from core.models import DriveSyncState, MediaRequest, SiteSetting
+
+STATE_KEY = "data_folder_changes"
+REQUEST_NUMBER_RE = re.compile(r"^\d{8}_\d{4}_\d{4,}$")
+# Rows read or written per query, well under SQLite's bound-parameter limit.
+BATCH_SIZE = 500
+
+
+def data_folder_id():
+    site_settings = SiteSetting.load()
+    return extract_folder_id(site_settings.drive_data_folder) if site_settings else None
+
+
+def watched_folder_ids(site_settings, folder_id: str) -> set:
+    """The data folder, the archive folder and, with sharding on, every YYYY/MM shard (this month's is created)."""
+    watched = {folder_id}
+    archive_id = extract_folder_id(site_settings.drive_archive_folder)
+    if archive_id:
+        watched.add(archive_id)
+    if site_settings.shard_data_folder:
+        drive_shards.shard_folder_id(folder_id, timezone.now().strftime("%Y/%m"), create=True)
+        watched.update(drive_shards.shard_folders(folder_id).values())
+    return watched
+
+
+def _request_stem(name: str):
+    stem, _ = os.path.splitext(name or "")
+    return stem if REQUEST_NUMBER_RE.match(stem) else None
+
+
+def _set_result(rows, file_id: str, name: str) -> int:
+    """Update the result link on rows, bumping updated_at so pollers and cached stats see it."""
+    return rows.update(result_file_id=file_id, result_file_name=name, updated_at=timezone.now())
+
+
+def _detach(file_id: str, keep_request_number: str | None = None) -> int:
+    """Clear the result link from rows pointing at a file (except one that still matches it)."""
+    rows = MediaRequest.objects.filter(result_file_id=file_id)
+    if keep_request_number:
+        rows = rows.exclude(request_number=keep_request_number)
+    return _set_result(rows, "", "")
+
+
+def _attach(request_number: str, file_id: str, name: str) -> int:
+    rows = MediaRequest.objects.filter(request_number=request_number).exclude(
+        result_file_id=file_id, result_file_name=name
+    )
+    return _set_result(rows, file_id, name)
+
+
+def _change_stem(change: dict, folder_ids):
+    """The request number a change's file now answers for, or None if it is gone or outside the watched folders."""
+    f = change.get("file") or {}
+    if change.get("removed") or f.get("trashed") or set(folder_ids).isdisjoint(f.get("parents", [])):
+        return None
+    return _request_stem(f.get("name"))
+
+
+def apply_changes(changes, folder_ids) -> None:
+    """Reflect a page of changes.list entries (new, renamed, moved, trashed or deleted files) onto MediaRequest rows.
+
+    The feed covers the whole drive, so changes to files outside the watched
+    folders only touch the database when one of them is still linked to a
+    row (one query per page to find out).
+    """
+    stems = [(change, _change_stem(change, folder_ids)) for change in changes]
+    outside = [change["fileId"] for change, stem in stems if not stem]
+    linked = set(MediaRequest.objects.filter(result_file_id__in=outside).values_list("result_file_id", flat=True)
+                 ) if outside else set()
+    for change, stem in stems:
+        if stem:
+            _detach(change["fileId"], keep_request_number=stem)
+            _attach(stem, change["fileId"], change["file"]["name"])
+        elif change["fileId"] in linked:
+            _detach(change["fileId"])
+
+
+def full_sync(state: DriveSyncState, folder_id: str, folder_ids=None) -> int:
+    """List the whole folder (and its shards) once and rebuild every row's result link from it."""
+    # Take the token first so changes made while listing are replayed next time.
+    token = get_start_page_token()
+    files = {}
+    for listed_id in sorted(folder_ids or {folder_id}):
+        for f in iter_files_in_folder(listed_id, folders=False):
+            stem = _request_stem(f["name"])
+            if stem:
+                files.setdefault(stem, f)
+
+    # Compare in Python and write in bounded batches: an IN list with one
+    # parameter per Drive file breaks SQLite past 32766 files.
+    listed_ids = {f["id"] for f in files.values()}
+    stale = [pk for pk, file_id in MediaRequest.objects.exclude(result_file_id="")
+             .values_list("pk", "result_file_id").iterator() if file_id not in listed_ids]
+    for i in range(0, len(stale), BATCH_SIZE):
+        _set_result(MediaRequest.objects.filter(pk__in=stale[i:i + BATCH_SIZE]), "", "")
+
+    stems = list(files)
+    now = timezone.now()
+    for i in range(0, len(stems), BATCH_SIZE):
+        changed = []
+        for media_req in MediaRequest.objects.filter(request_number__in=stems[i:i + BATCH_SIZE]).only(
+            "pk", "request_number", "result_file_id", "result_file_name"
+        ):
+            f = files[media_req.request_number]
+            if (media_req.result_file_id, media_req.result_file_name) != (f["id"], f["name"]):
+                media_req.result_file_id, media_req.result_file_name, media_req.updated_at = f["id"], f["name"], now
+                changed.append(media_req)
+        MediaRequest.objects.bulk_update(changed, ["result_file_id", "result_file_name", "updated_at"])
+
+    state.folder_id = folder_id
+    state.page_token = token
+    state.save()
+    return len(files)
+
+
+def sync_changes(state: DriveSyncState, folder_id: str, folder_ids=None) -> int:
+    """Apply every change since the stored token, persisting progress after each page."""
+    folder_ids = folder_ids or {folder_id}
+    site_settings = SiteSetting.load()
+    sharded = bool(site_settings and site_settings.shard_data_folder)
+    applied = 0
+    token = state.page_token
+    while token:
+        changes, next_token, new_start_token = list_changes(token)
+        for change in changes:
+            f = change.get("file") or {}
+            if sharded and (change.get("removed") or f.get("mimeType") == FOLDER_MIMETYPE):
+                # A shard folder appeared, moved or went away: re-read the shard list.
+                drive_shards.forget_folder(folder_id, change["fileId"], f.get("name", ""))
+                folder_ids = watched_folder_ids(site_settings, folder_id)
+        apply_changes(changes, folder_ids)
+        applied += len(changes)
+        token = next_token
+        state.page_token = next_token or new_start_token
+        state.save(update_fields=["page_token", "updated_at"])
+    return applied
+
+
+def sync_once(full: bool = False) -> str:
+    """Run one sync pass for the configured data folder and describe what happened."""
+    folder_id = data_folder_id()
+    if not folder_id:
+        return "No data folder configured."
+    folder_ids = watched_folder_ids(SiteSetting.load(), folder_id)
+    state, _ = DriveSyncState.objects.get_or_create(key=STATE_KEY)
+    if full or not state.page_token or state.folder_id != folder_id:
+        return f"Full sync: {full_sync(state, folder_id, folder_ids)} result file(s) linked."
+    return f"Applied {sync_changes(state, folder_id, folder_ids)} change(s)."
@@ -0,0 +1,102 @@
+# core/exports.py
+
+import csv
+import datetime
+import tempfile
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+# (column header, MediaRequest lookup); user columns come from the same JOIN.
+EXPORT_COLUMNS = [
+    ('Request number', 'request_number'),
+    ('Status', 'status'),
+    ('Date', 'date'),
+    ('Time', 'time'),
+    ('Location', 'location'),
+    ('Customer name', 'customer_name'),
+    ('Customer email', 'customer_email'),
+    ('Customer phone', 'customer_phone'),
+    ('Note', 'note'),
+    ('Reference image Drive id', 'reference_image_drive_id'),
+    ('Result file id', 'result_file_id'),
+    ('Created at', 'created_at'),
+    ('Updated at', 'updated_at'),
+    ('Username', 'user__username'),
+    ('User email', 'user__email'),
+    ('Primary phone', 'user__primary_phone'),
+    ('Primary type', 'user__primary_type'),
+    ('Secondary phone', 'user__secondary_phone'),
+    ('Satsangi', 'user__is_satsangi'),
+    ('Ambrish', 'user__is_ambrish'),
+]
+
+
+def filter_requests(queryset, status=None, date_from=None, date_to=None):
+    """Narrow a MediaRequest queryset by status and an inclusive range of request dates."""
+    if status:
+        queryset = queryset.filter(status=status)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset
+
+
+def iter_rows(queryset, chunk_size=None):
+    """Yield one tuple per request, fetched from a server-side cursor in chunks."""
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    rows = queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+    for row in rows:
+        # Spreadsheets have no time zones; export local wall-clock time.
+        yield tuple(
+            timezone.localtime(value).replace(tzinfo=None) if isinstance(value, datetime.datetime) else value
+            for value in row
+        )
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset, chunk_size=None):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for row in iter_rows(queryset, chunk_size):
+        yield writer.writerow(row)
+
+
+def csv_response(queryset, filename='requests.csv'):
+    response = StreamingHttpResponse(iter_csv(queryset), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def write_xlsx(queryset, fileobj, chunk_size=None):
+    """Write requests to an XLSX file or path with openpyxl's write-only (streaming) worksheet."""
+    # openpyxl (and the numpy it pulls in) is imported on first export, not at startup.
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Requests')
+    sheet.append([header for header, _ in EXPORT_COLUMNS])
+    for row in iter_rows(queryset, chunk_size):
+        sheet.append(row)
+    workbook.save(fileobj)
+
+
+def xlsx_response(queryset, filename='requests.xlsx'):
+    # XLSX is a zip and needs its central directory at the end, so it is
+    # spooled to an anonymous temp file (removed when the response closes).
+    tmp = tempfile.TemporaryFile()
+    write_xlsx(queryset, tmp)
+    tmp.seek(0)
+    return FileResponse(
+        tmp,
+        as_attachment=True,
+        filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
@@ -0,0 +1,299 @@
+# core/fake_drive.py
+
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from email.parser import Parser
+from urllib.parse import parse_qs, urlparse
+from django.test.utils import override_settings
+from core import drive_index, google_drive
+
+SESSION_ROOT = "https://fake-drive.invalid/upload/"
+BATCH_BOUNDARY = "fake_drive_batch"
+PARENT_RE = re.compile(r"'((?:[^'\\]|\\.)*)' in parents")
+NAME_CONTAINS_RE = re.compile(r"name contains '((?:[^'\\]|\\.)*)'")
+NAME_EQUALS_RE = re.compile(r"name = '((?:[^'\\]|\\.)*)'")
+MIMETYPE_RE = re.compile(r"mimeType (!?=) '((?:[^'\\]|\\.)*)'")
+APP_PROPERTY_RE = re.compile(r"appProperties has \{ key='((?:[^'\\]|\\.)*)' and value='((?:[^'\\]|\\.)*)' \}")
+
+
+def _unquote(value: str) -> str:
+    return re.sub(r"\\(.)", r"\1", value)
+
+
+class FakeResponse(dict):
+    """Just enough of httplib2.Response for googleapiclient: a header dict with .status and .reason."""
+
+    def __init__(self, status: int, headers: dict | None = None):
+        super().__init__({k.lower(): str(v) for k, v in (headers or {}).items()})
+        self.status = status
+        self.reason = "OK" if status < 400 else "Error"
+        self["status"] = str(status)
+
+
+class FakeDrive:
+    """In-process stand-in for the Drive v3 endpoints the app uses.
+
+    Implements files.list (with paging and the query forms core.google_drive
+    builds), metadata-only and resumable files.create, files.update
+    (renames and re-parenting), changes.getStartPageToken and changes.list. Every HTTP round trip sleeps ``latency`` seconds (plus up to
+    ``jitter``), and ``error_rate`` of them answer 503, so latency-bound and
+    retry paths can be measured without Google credentials.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.files = {}
+        self.changes = []  # fileIds, in change order; a page token is an index into this list
+        self.requests = 0
+        self.permissions = {}  # fileId -> [permission bodies]
+        self._sessions = {}
+        self._ids = itertools.count(1)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # --- state helpers -------------------------------------------------------
+
+    def add_file(self, name: str, folder_id: str, **extra) -> dict:
+        """Create a file directly (no HTTP round trip) and record it in the changes feed."""
+        with self._lock:
+            f = {"id": f"fake{next(self._ids):08d}", "name": name, "parents": [folder_id], "trashed": False,
+                 "mimeType": extra.pop("mimeType", "application/octet-stream"), **extra}
+            self.files[f["id"]] = f
+            self.changes.append(f["id"])
+        return f
+
+    def update_file(self, file_id: str, **changes) -> dict:
+        with self._lock:
+            self.files[file_id].update(changes)
+            self.changes.append(file_id)
+            return self.files[file_id]
+
+    def http(self):
+        """Return a new httplib2-compatible client bound to this fake (one per pooled service)."""
+        return FakeHttp(self)
+
+    # --- HTTP dispatch -------------------------------------------------------
+
+    def handle(self, uri: str, method: str, body, headers: dict):
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.requests += 1
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self._error(503, "backendError")
+            if uri.startswith(SESSION_ROOT):
+                return self._upload_chunk(urlparse(uri).path.rsplit("/", 1)[-1], body, headers)
+            if urlparse(uri).path == "/batch/drive/v3" and method == "POST":
+                return self._batch(body, headers)
+            return self._dispatch(uri, method, body, headers)
+
+    def _dispatch(self, uri: str, method: str, body, headers: dict):
+        """Route one Drive API call (a plain HTTP request or one part of a batch); caller holds the lock."""
+        url = urlparse(uri)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path
+        if path == "/upload/drive/v3/files" and method == "POST":
+            return self._start_upload(body, headers)
+        if path == "/drive/v3/files" and method == "GET":
+            return self._list_files(params)
+        if path == "/drive/v3/files" and method == "POST":
+            return self._create_file(body)
+        if path.startswith("/drive/v3/files/") and method == "PATCH":
+            return self._update_file(path.rsplit("/", 1)[-1], params, body)
+        if path.startswith("/drive/v3/files/") and path.endswith("/copy") and method == "POST":
+            return self._copy_file(path.split("/")[-2], body)
+        if path.startswith("/drive/v3/files/") and path.endswith("/permissions") and method == "POST":
+            return self._create_permission(path.split("/")[-2], body)
+        if path == "/drive/v3/changes/startPageToken":
+            return self._json({"kind": "drive#startPageToken", "startPageToken": str(len(self.changes))})
+        if path == "/drive/v3/changes" and method == "GET":
+            return self._list_changes(params)
+        return self._error(404, "notFound")
+
+    def _json(self, payload: dict, status: int = 200, headers: dict | None = None):
+        return FakeResponse(status, {"content-type": "application/json", **(headers or {})}), \
+            json.dumps(payload).encode()
+
+    def _error(self, status: int, reason: str):
+        return self._json({"error": {"code": status, "message": reason, "errors": [{"reason": reason}]}}, status)
+
+    def _list_files(self, params: dict):
+        query = params.get("q", "")
+        parent = PARENT_RE.search(query)
+        prefix = NAME_CONTAINS_RE.search(query)
+        app_property = APP_PROPERTY_RE.search(query)
+        name = NAME_EQUALS_RE.search(query)
+        mimetype = MIMETYPE_RE.search(query)
+        matches = [
+            f for f in self.files.values()
+            if (not parent or _unquote(parent.group(1)) in f["parents"])
+            and ("trashed = false" not in query or not f["trashed"])
+            and (not prefix or f["name"].startswith(_unquote(prefix.group(1))))
+            and (not app_property or f.get("appProperties", {}).get(_unquote(app_property.group(1)))
+                 == _unquote(app_property.group(2)))
+            and (not name or f["name"] == _unquote(name.group(1)))
+            and (not mimetype or (f["mimeType"] == _unquote(mimetype.group(2))) == (mimetype.group(1) == "="))
+        ]
+        offset = int(params.get("pageToken") or 0)
+        size = int(params.get("pageSize") or 100)
+        payload = {"files": [dict(f) for f in matches[offset:offset + size]]}
+        if offset + size < len(matches):
+            payload["nextPageToken"] = str(offset + size)
+        return self._json(payload)
+
+    def _create_file(self, body):
+        metadata = json.loads(body or b"{}")
+        f = {"id": f"fake{next(self._ids):08d}", "name": metadata.get("name", "untitled"),
+             "parents": metadata.get("parents", []), "trashed": False,
+             "mimeType": metadata.get("mimeType", "application/octet-stream")}
+        self.files[f["id"]] = f
+        self.changes.append(f["id"])
+        return self._json({"id": f["id"]})
+
+    def _update_file(self, file_id: str, params: dict, body):
+        f = self.files.get(file_id)
+        if f is None:
+            return self._error(404, "notFound")
+        f.update({k: v for k, v in json.loads(body or b"{}").items() if k in ("name", "trashed")})
+        removed = set(params.get("removeParents", "").split(","))
+        f["parents"] = [p for p in f["parents"] if p not in removed]
+        f["parents"] += [p for p in params.get("addParents", "").split(",") if p and p not in f["parents"]]
+        self.changes.append(file_id)
+        return self._json({"id": file_id})
+
+    def _copy_file(self, file_id: str, body):
+        source = self.files.get(file_id)
+        if source is None or source["trashed"]:
+            return self._error(404, "notFound")
+        f = {**source, "id": f"fake{next(self._ids):08d}", **json.loads(body or b"{}")}
+        self.files[f["id"]] = f
+        self.changes.append(f["id"])
+        return self._json({"id": f["id"]})
+
+    def _create_permission(self, file_id: str, body):
+        if file_id not in self.files:
+            return self._error(404, "notFound")
+        permissions = self.permissions.setdefault(file_id, [])
+        permissions.append(json.loads(body or b"{}"))
+        return self._json({"id": f"perm{len(permissions)}"})
+
+    def _batch(self, body, headers: dict):
+        """Answer a multipart/mixed batch, running each application/http part through _dispatch()."""
+        if isinstance(body, bytes):
+            body = body.decode()
+        message = Parser().parsestr(f"content-type: {headers['content-type']}\r\n\r\n{body}")
+        parts = []
+        for part in message.get_payload():
+            request_line, _, rest = part.get_payload().partition("\n")
+            head, _, part_body = rest.partition("\n\n")
+            method, target, _ = request_line.split(" ", 2)
+            part_headers = dict(line.split(": ", 1) for line in head.splitlines() if ": " in line)
+            if self.error_rate and self._random.random() < self.error_rate:
+                response, content = self._error(403, "userRateLimitExceeded")
+            else:
+                response, content = self._dispatch("https://www.googleapis.com" + target, method,
+                                                   part_body or None, {k.lower(): v for k, v in part_headers.items()})
+            parts.append(
+                f"--{BATCH_BOUNDARY}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'][1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 {response.status} {response.reason}\r\nContent-Type: application/json\r\n\r\n"
+                f"{content.decode()}\r\n"
+            )
+        payload = "".join(parts) + f"--{BATCH_BOUNDARY}--\r\n"
+        return FakeResponse(200, {"content-type": f"multipart/mixed; boundary={BATCH_BOUNDARY}"}), payload.encode()
+
+    def _list_changes(self, params: dict):
+        offset = int(params["pageToken"])
+        size = int(params.get("pageSize") or 100)
+        page = self.changes[offset:offset + size]
+        payload = {"changes": []}
+        for file_id in page:
+            f = self.files.get(file_id)
+            change = {"fileId": file_id, "removed": f is None}
+            if f:
+                change["file"] = dict(f)
+            payload["changes"].append(change)
+        if offset + size < len(self.changes):
+            payload["nextPageToken"] = str(offset + size)
+        else:
+            payload["newStartPageToken"] = str(len(self.changes))
+        return self._json(payload)
+
+    def _start_upload(self, body, headers: dict):
+        metadata = json.loads(body or b"{}")
+        session = f"s{next(self._ids)}"
+        self._sessions[session] = {"metadata": metadata, "data": bytearray(),
+                                   "mimeType": headers.get("x-upload-content-type")}
+        return FakeResponse(200, {"location": SESSION_ROOT + session}), b""
+
+    def _upload_chunk(self, session_id: str, body, headers: dict):
+        session = self._sessions.get(session_id)
+        if session is None:
+            return self._error(404, "notFound")
+        content_range = headers.get("content-range", "")
+        _, _, total = content_range.rpartition("/")
+        if body:
+            start = int(content_range.split(" ")[1].split("-")[0])
+            del session["data"][start:]
+            session["data"].extend(body if isinstance(body, bytes) else body.encode())
+        received = len(session["data"])
+        if total != "*" and received >= int(total):
+            del self._sessions[session_id]
+            metadata = session["metadata"]
+            f = {"id": f"fake{next(self._ids):08d}", "name": metadata.get("name", "untitled"),
+                 "parents": metadata.get("parents", []), "trashed": False,
+                 "mimeType": session["mimeType"] or "application/octet-stream", "size": str(received)}
+            if metadata.get("appProperties"):
+                f["appProperties"] = metadata["appProperties"]
+            self.files[f["id"]] = f
+            self.changes.append(f["id"])
+            return self._json({"id": f["id"]})
+        headers = {"range": f"bytes=0-{received - 1}"} if received else {}
+        return FakeResponse(308, headers), b""
+
+
+class FakeHttp:
+    """httplib2.Http look-alike that routes googleapiclient requests into a FakeDrive."""
+
+    def __init__(self, drive: FakeDrive):
+        self.drive = drive
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        if hasattr(body, "read"):
+            body = body.read()
+        return self.drive.handle(uri, method, body, {k.lower(): v for k, v in (headers or {}).items()})
+
+
+class FakeDrivePool(google_drive.DriveServicePool):
+    """Service pool whose services talk to a FakeDrive instead of Google."""
+
+    def __init__(self, drive: FakeDrive, size: int):
+        self.drive = drive
+        super().__init__(size)
+
+    def _build(self, credentials_factory):
+        from googleapiclient.discovery import build_from_document
+        return build_from_document(google_drive._discovery_document(), http=self.drive.http())
+
+
+@contextmanager
+def installed(drive: FakeDrive, pool_size: int = 8):
+    """Route every core.google_drive call in this process to ``drive`` for the duration of the block."""
+    old_pool = google_drive._pool
+    google_drive._pool = FakeDrivePool(drive, pool_size)
+    try:
+        with override_settings(GOOGLE_DRIVE_CREDENTIALS_INFO={"type": "fake_drive"}):
+            yield drive
+    finally:
+        google_drive._pool = old_pool
+        # Folder indexes built from fake listings must not outlive the fake.
+        for folder_id in drive_index.cache.get(drive_index.FOLDERS_KEY, []):
+            drive_index.invalidate_folder_index(folder_id)
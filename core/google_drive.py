@@ -1,11 +1,29 @@
 # core/google_drive.py
 
+import functools
+import json
+import mimetypes
+import os
+import queue
+import random
 import re
+import threading
+import time
+from contextlib import contextmanager
 from django.conf import settings
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from core.metrics import timed_drive_call
+
+# The Google client libraries take a few hundred milliseconds to import, so
+# they are imported inside the functions that talk to Drive; commands and
+# workers that never touch Drive do not pay for them.
 
 FOLDER_ID_RE = re.compile(r"/folders/([a-zA-Z0-9_-]{10,})")
+MAX_PAGE_SIZE = 1000
+UPLOAD_CHUNK_UNIT = 256 * 1024
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+MAX_BATCH_SIZE = 100
+FOLDER_MIMETYPE = "application/vnd.google-apps.folder"
 
 
 def extract_folder_id(link_or_id):
@@ -18,61 +36,467 @@ def extract_folder_id(link_or_id):
     return link_or_id
 
 
+@functools.lru_cache(maxsize=None)
+def get_credentials():
+    """Build the service-account credentials from GOOGLE_DRIVE_CREDENTIALS_INFO once; None if unset."""
+    if not settings.GOOGLE_DRIVE_CREDENTIALS_INFO:
+        return None
+    from google.oauth2 import service_account
+    return service_account.Credentials.from_service_account_info(
+        settings.GOOGLE_DRIVE_CREDENTIALS_INFO, scopes=settings.GOOGLE_DRIVE_SCOPES
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _discovery_document() -> dict:
+    """Parse the Drive v3 discovery document bundled with googleapiclient, once per process."""
+    from googleapiclient.discovery_cache import get_static_doc
+    return json.loads(get_static_doc("drive", "v3"))
+
+
+def warm_up() -> None:
+    """Import the Drive client and parse its discovery document and credentials.
+
+    Meant for a pre-fork master process: workers inherit the loaded modules
+    and parsed objects, but no service or connection (the pool is per process).
+    """
+    import google_auth_httplib2  # noqa: F401
+    from googleapiclient import discovery, errors, http  # noqa: F401
+    _discovery_document()
+    get_credentials()
+
+
+class DriveServicePool:
+    """Per-process pool of authorized Drive v3 service objects.
+
+    httplib2 connections are not thread-safe, so each service is checked out
+    by one thread at a time and returned afterwards, keeping its connection
+    alive for the next caller. All services share the settings credentials,
+    so an access token is fetched once and reused until it expires. A pool
+    inherited across fork() is discarded rather than sharing sockets with
+    the parent process.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._created = 0
+
+    def _build(self, credentials_factory):
+        import google_auth_httplib2
+        import httplib2
+        from googleapiclient.discovery import build_from_document
+
+        http = google_auth_httplib2.AuthorizedHttp(
+            credentials_factory(), http=httplib2.Http(timeout=settings.DRIVE_HTTP_TIMEOUT)
+        )
+        return build_from_document(_discovery_document(), http=http)
+
+    def _checkout(self, credentials_factory):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if self._created < self.size:
+                self._created += 1
+                build_new = True
+            else:
+                build_new = False
+        if build_new:
+            try:
+                return self._build(credentials_factory)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    @contextmanager
+    def service(self, credentials_factory):
+        """Check out a service, building one with ``credentials_factory()`` if none is idle."""
+        service = self._checkout(credentials_factory)
+        try:
+            yield service
+        finally:
+            if self._pid == os.getpid():
+                self._idle.put(service)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def drive_service():
+    """Check out a pooled Drive service for the configured credentials (use as a context manager)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DriveServicePool(settings.DRIVE_SERVICE_POOL_SIZE)
+    return _pool.service(get_credentials)
+
+
+def _chunk_size(chunk_size: int | None) -> int:
+    """Drive requires resumable chunks in multiples of 256 KiB."""
+    size = chunk_size or settings.DRIVE_UPLOAD_CHUNK_SIZE
+    return max(UPLOAD_CHUNK_UNIT, size - size % UPLOAD_CHUNK_UNIT)
+
+
+def _is_transient(error: Exception) -> bool:
+    import httplib2
+    from googleapiclient.errors import HttpError
+
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUSES
+    return isinstance(error, (OSError, httplib2.HttpLib2Error))
+
+
+def _is_throttled(error: Exception) -> bool:
+    """True for per-request errors worth retrying: 429/5xx and Drive's 403 rate-limit reasons."""
+    from googleapiclient.errors import HttpError
+
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status in RETRYABLE_STATUSES:
+        return True
+    if error.resp.status == 403:
+        try:
+            errors = json.loads(error.content)["error"]["errors"]
+        except (ValueError, KeyError, TypeError):
+            return False
+        return any(e.get("reason") in RATE_LIMIT_REASONS for e in errors)
+    return False
+
+
+class _BatchCollections:
+    """Service stand-in whose ``files()``, ``permissions()``, ... are built once per batch.
+
+    Each call on a real service builds a fresh resource from the discovery
+    document (about 10 ms), which would dominate a 100-item batch.
+    """
+
+    def __init__(self, service):
+        self._service = service
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name not in self._collections:
+            self._collections[name] = getattr(self._service, name)()
+        return lambda: self._collections[name]
+
+
+@timed_drive_call
+def execute_batch(operations: dict, retries: int | None = None) -> dict:
+    """Run many Drive calls through batch requests and return {key: (response, error)}.
+
+    ``operations`` maps a caller-chosen key to ``fn(service)`` returning an
+    unexecuted request, e.g. ``lambda s: s.files().update(fileId=..., ...)``.
+    Up to MAX_BATCH_SIZE calls share one HTTP round trip. Throttled items
+    (and whole batches lost to a transient error) are re-sent with backoff, up
+    to ``retries`` times (DRIVE_UPLOAD_RETRIES by default); every other
+    outcome is reported per key instead of raised.
+    """
+    retries = settings.DRIVE_UPLOAD_RETRIES if retries is None else retries
+    results = {}
+    pending = list(operations.items())
+    attempt = 0
+    while pending:
+        throttled = []
+        for start in range(0, len(pending), MAX_BATCH_SIZE):
+            chunk = pending[start:start + MAX_BATCH_SIZE]
+            responses = {}
+
+            def collect(request_id, response, exception, responses=responses):
+                responses[int(request_id)] = (response, exception)
+
+            try:
+                with drive_service() as service:
+                    batch = service.new_batch_http_request(callback=collect)
+                    collections = _BatchCollections(service)
+                    for i, (_, build_request) in enumerate(chunk):
+                        batch.add(build_request(collections), request_id=str(i))
+                    batch.execute()
+            except Exception as e:
+                if not (_is_transient(e) or _is_throttled(e)):
+                    raise
+                responses = {i: (None, e) for i in range(len(chunk))}
+
+            for i, item in enumerate(chunk):
+                response, error = responses.get(i, (None, None))
+                if error is not None and attempt < retries and (_is_transient(error) or _is_throttled(error)):
+                    throttled.append(item)
+                else:
+                    results[item[0]] = (response, error)
+        pending = throttled
+        if pending:
+            attempt += 1
+            time.sleep(min(2 ** attempt, 60) * random.uniform(0.5, 1.0))
+    return results
+
+
+def move_files(moves: dict, **kwargs) -> dict:
+    """Re-parent files in batches: ``{file_id: (from_folder_id, to_folder_id)}`` -> execute_batch() results."""
+    return execute_batch({
+        file_id: functools.partial(_move_request, file_id, from_id, to_id)
+        for file_id, (from_id, to_id) in moves.items()
+    }, **kwargs)
+
+
+def _move_request(file_id, from_folder_id, to_folder_id, service):
+    return service.files().update(fileId=file_id, addParents=to_folder_id, removeParents=from_folder_id,
+                                  fields="id,parents", supportsAllDrives=True)
+
+
+def share_files(file_ids, role: str = "reader", **kwargs) -> dict:
+    """Give "anyone with the link" ``role`` access to each file, in batches -> execute_batch() results."""
+    return execute_batch({
+        file_id: functools.partial(_share_request, file_id, role) for file_id in file_ids
+    }, **kwargs)
+
+
+def _share_request(file_id, role, service):
+    return service.permissions().create(fileId=file_id, body={"type": "anyone", "role": role},
+                                        fields="id", supportsAllDrives=True)
+
+
+@timed_drive_call
+def create_drive_file_from_stream(fileobj, filename: str, folder_id: str, mimetype: str | None = None,
+                                  app_properties: dict | None = None, chunk_size: int | None = None) -> str:
+    """Stream a seekable file-like object (e.g. a Django UploadedFile) to Drive and return its id.
+
+    The file is sent as a resumable upload one chunk at a time, so memory use
+    is bounded by the chunk size. After a transient failure the next attempt
+    asks Drive how many bytes it has and resumes from there instead of
+    restarting. Raises once DRIVE_UPLOAD_RETRIES consecutive attempts fail.
+    """
+    from googleapiclient.http import MediaIoBaseUpload
+
+    file_metadata = {
+        "name": filename,
+        "parents": [folder_id]
+    }
+    if app_properties:
+        file_metadata["appProperties"] = app_properties
+    mimetype = mimetype or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    media = MediaIoBaseUpload(fileobj, mimetype=mimetype, chunksize=_chunk_size(chunk_size), resumable=True)
+
+    with drive_service() as service:
+        request = service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields="id",
+            supportsAllDrives=True,
+        )
+        created_file = None
+        failures = 0
+        while created_file is None:
+            try:
+                _, created_file = request.next_chunk()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                if not _is_transient(e) or failures > settings.DRIVE_UPLOAD_RETRIES:
+                    raise
+                time.sleep(min(2 ** failures, 60) * random.uniform(0.5, 1.0))
+
+    # The folder listing changed, so the cached stem index is stale.
+    from core.drive_index import invalidate_folder_index
+    invalidate_folder_index(folder_id)
+    return created_file.get("id")
+
+
+def create_drive_file(file_path: str, filename: str, folder_id: str, app_properties: dict | None = None) -> str:
+    """Upload a local file into a Drive folder and return its id, raising on any failure."""
+    with open(file_path, "rb") as fh:
+        return create_drive_file_from_stream(fh, filename, folder_id, app_properties=app_properties)
+
+
+@timed_drive_call
+def copy_file(file_id: str, filename: str, folder_id: str, app_properties: dict | None = None) -> str:
+    """Copy a Drive file into a folder under a new name (server-side, nothing is uploaded) and return the copy's id."""
+    body = {"name": filename, "parents": [folder_id]}
+    if app_properties:
+        body["appProperties"] = app_properties
+    with drive_service() as service:
+        copied = service.files().copy(fileId=file_id, body=body, fields="id", supportsAllDrives=True).execute()
+    return copied["id"]
+
+
 def upload_file_to_drive(file_path: str, filename: str, folder_id: str) -> str | None:
     """Upload file to Google Drive using pre-configured credentials."""
-    # Get the credentials object directly from settings
-    credentials = settings.GOOGLE_DRIVE_CREDENTIALS
-
-    if not credentials:
+    if not settings.GOOGLE_DRIVE_CREDENTIALS_INFO:
         print("ERROR: Google Drive credentials are not configured in settings.py.")
         return None
 
     try:
-        service = build("drive", "v3", credentials=credentials)
-        file_metadata = {
-            "name": filename,
-            "parents": [folder_id]
-        }
-        media = MediaFileUpload(file_path, resumable=True)
-        created_file = (
+        return create_drive_file(file_path, filename, folder_id)
+    except Exception as e:
+        print(f"An error occurred during Google Drive upload: {e}")
+        return None
+
+
+@timed_drive_call
+def find_file_by_app_property(folder_id: str, key: str, value: str):
+    """Return the first {"id", "name"} in a folder tagged with appProperties[key] == value."""
+    query = (
+        f"'{_quote(folder_id)}' in parents and trashed = false"
+        f" and appProperties has {{ key='{_quote(key)}' and value='{_quote(value)}' }}"
+    )
+    with drive_service() as service:
+        results = (
             service.files()
-            .create(
-                body=file_metadata,
-                media_body=media,
-                fields="id",
+            .list(
+                q=query,
+                pageSize=1,
+                fields="files(id,name)",
                 supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
             )
             .execute()
         )
-        return created_file.get("id")
-    except Exception as e:
-        print(f"An error occurred during Google Drive upload: {e}")
-        return None
+    files = results.get("files", [])
+    return files[0] if files else None
 
 
-def list_files_in_folder(folder_id: str):
-    """List files in a Google Drive folder using pre-configured credentials."""
-    # Get the credentials object directly from settings
-    credentials = settings.GOOGLE_DRIVE_CREDENTIALS
+def _quote(value: str) -> str:
+    """Escape a value for use inside a single-quoted Drive query string."""
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+@timed_drive_call
+def iter_files_in_folder(folder_id: str, page_size: int = MAX_PAGE_SIZE, fields: str = "id,name",
+                         name_prefix: str | None = None, folders: bool | None = None):
+    """Yield every file in a Google Drive folder, following nextPageToken across pages.
 
-    if not credentials:
+    ``fields`` is the per-file projection (e.g. "id,name,modifiedTime");
+    ``name_prefix`` narrows the listing server-side, and ``folders`` keeps
+    only subfolders (True) or only non-folders (False). Drive errors are raised
+    to the caller instead of being swallowed, so a failed page is never
+    mistaken for the end of the folder.
+    """
+    if not settings.GOOGLE_DRIVE_CREDENTIALS_INFO:
         print("ERROR: Google Drive credentials are not configured in settings.py.")
-        return []
+        return
+
+    query = f"'{_quote(folder_id)}' in parents and trashed = false"
+    if name_prefix:
+        # Drive's "contains" operator is a prefix match for name terms.
+        query += f" and name contains '{_quote(name_prefix)}'"
+    if folders is not None:
+        query += f" and mimeType {'=' if folders else '!='} '{FOLDER_MIMETYPE}'"
+
+    page_token = None
+    while True:
+        with drive_service() as service:
+            results = (
+                service.files()
+                .list(
+                    q=query,
+                    pageSize=max(1, min(page_size, MAX_PAGE_SIZE)),
+                    pageToken=page_token,
+                    fields=f"nextPageToken, files({fields})",
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True,
+                )
+                .execute()
+            )
+        yield from results.get("files", [])
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            return
 
+
+def list_files_in_folder(folder_id: str, **kwargs):
+    """List files in a Google Drive folder using pre-configured credentials."""
     try:
-        service = build("drive", "v3", credentials=credentials)
-        query = f"'{folder_id}' in parents and trashed = false"
+        return list(iter_files_in_folder(folder_id, **kwargs))
+    except Exception as e:
+        print(f"An error occurred while listing Google Drive files: {e}")
+        return []
+
+
+def find_file_by_stem(folder_id: str, stem: str):
+    """Return the first {"id", "name"} in a folder whose name minus extension is ``stem``."""
+    for f in iter_files_in_folder(folder_id, page_size=10, name_prefix=stem):
+        if os.path.splitext(f["name"])[0] == stem:
+            return f
+    return None
+
+
+@timed_drive_call
+def find_folder(parent_id: str, name: str) -> str | None:
+    """Return the id of the subfolder called ``name`` directly under ``parent_id``, or None."""
+    query = (
+        f"'{_quote(parent_id)}' in parents and trashed = false"
+        f" and mimeType = '{FOLDER_MIMETYPE}' and name = '{_quote(name)}'"
+    )
+    with drive_service() as service:
         results = (
             service.files()
             .list(
                 q=query,
-                fields="files(id,name)",
+                pageSize=1,
+                fields="files(id)",
                 supportsAllDrives=True,
                 includeItemsFromAllDrives=True,
             )
             .execute()
         )
-        return results.get("files", [])
-    except Exception as e:
-        print(f"An error occurred while listing Google Drive files: {e}")
-        return []
\ No newline at end of file
+    files = results.get("files", [])
+    return files[0]["id"] if files else None
+
+
+@timed_drive_call
+def create_folder(parent_id: str, name: str) -> str:
+    """Create a subfolder under ``parent_id`` and return its id."""
+    with drive_service() as service:
+        created = (
+            service.files()
+            .create(
+                body={"name": name, "mimeType": FOLDER_MIMETYPE, "parents": [parent_id]},
+                fields="id",
+                supportsAllDrives=True,
+            )
+            .execute()
+        )
+    return created["id"]
+
+
+@timed_drive_call
+def get_start_page_token() -> str:
+    """Return the changes feed token for "now"; changes after it are reported by list_changes()."""
+    with drive_service() as service:
+        response = service.changes().getStartPageToken(supportsAllDrives=True).execute()
+    return response["startPageToken"]
+
+
+@timed_drive_call
+def list_changes(page_token: str, page_size: int = MAX_PAGE_SIZE,
+                 fields: str = "fileId,removed,file(name,mimeType,parents,trashed)"):
+    """Fetch one page of the Drive changes feed.
+
+    Returns (changes, next_page_token, new_start_page_token); exactly one of
+    the two tokens is set, the latter once the feed is caught up.
+    """
+    with drive_service() as service:
+        response = (
+            service.changes()
+            .list(
+                pageToken=page_token,
+                pageSize=max(1, min(page_size, MAX_PAGE_SIZE)),
+                fields=f"nextPageToken, newStartPageToken, changes({fields})",
+                spaces="drive",
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+            )
+            .execute()
+        )
+    return response.get("changes", []), response.get("nextPageToken"), response.get("newStartPageToken")
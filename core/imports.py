@@ -0,0 +1,242 @@
+# core/imports.py
+
+import csv
+import datetime
+import os
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+from core.auth_backend import normalize_phone
+from core.models import MediaRequest, RequestNumberSequence, User, phone_validator
+
+CONTACT_TYPES = {value for value, _ in User._meta.get_field('primary_type').choices}
+STATUSES = {value for value, _ in MediaRequest.REQUEST_STATUS}
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.rejected = []  # (row number, reason, raw record)
+        # Keys a dry run would have inserted, so later chunks still see them as taken.
+        self.seen = set()
+
+    def reject(self, row_number, reason, record):
+        self.rejected.append((row_number, reason, record))
+
+
+def _header(value):
+    return str(value or '').strip().lower().replace(' ', '_')
+
+
+def _cell(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def iter_records(path):
+    """Yield (row number, {column: value}) from a CSV or XLSX file without loading it whole."""
+    if os.path.splitext(path)[1].lower() in ('.xlsx', '.xlsm'):
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            headers = [_header(h) for h in next(rows, [])]
+            for number, row in enumerate(rows, start=2):
+                if any(v not in (None, '') for v in row):
+                    yield number, {h: _cell(v) for h, v in zip(headers, row) if h}
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as fh:
+            reader = csv.DictReader(fh)
+            reader.fieldnames = [_header(h) for h in reader.fieldnames or []]
+            for number, row in enumerate(reader, start=2):
+                if any(row.values()):
+                    yield number, {h: _cell(v) for h, v in row.items() if h}
+
+
+def iter_chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _phone(value, required=True):
+    phone = normalize_phone(str(value or ''))
+    if not phone:
+        if required:
+            raise ValidationError('phone number is required')
+        return None
+    phone_validator(phone)
+    return phone
+
+
+def _date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value))
+    except ValueError:
+        raise ValidationError(f'invalid date {value!r}; use YYYY-MM-DD')
+
+
+def _time(value):
+    if isinstance(value, datetime.datetime):
+        return value.time()
+    if isinstance(value, datetime.time):
+        return value
+    try:
+        return datetime.time.fromisoformat(str(value))
+    except ValueError:
+        raise ValidationError(f'invalid time {value!r}; use HH:MM')
+
+
+def _clean_fields(instance, names):
+    """Run the model fields' own validation (max_length, email, ...) on an unsaved row; no queries."""
+    errors = []
+    for name in names:
+        field = instance._meta.get_field(name)
+        try:
+            setattr(instance, field.attname, field.clean(getattr(instance, field.attname), instance))
+        except ValidationError as e:
+            errors.extend(f'{name}: {message}' for message in e.messages)
+    if errors:
+        raise ValidationError(errors)
+
+
+def _error(e):
+    return '; '.join(e.messages) if isinstance(e, ValidationError) else str(e)
+
+
+def import_users(chunk, result, dry_run=False):
+    """Validate and bulk-insert one chunk of user records.
+
+    A password column costs one hash per row; rows without one get an
+    unusable password and must reset it before logging in.
+    """
+    usernames = {str(record.get('username') or '') for _, record in chunk}
+    taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True)) | result.seen
+    users = []
+    for number, record in chunk:
+        try:
+            username = str(record.get('username') or '')
+            if not username:
+                raise ValidationError('username is required')
+            if username in taken:
+                raise ValidationError('username is already taken')
+            primary_type = record.get('primary_type') or 'whatsapp'
+            secondary_type = record.get('secondary_type') or None
+            if primary_type not in CONTACT_TYPES or (secondary_type and secondary_type not in CONTACT_TYPES):
+                raise ValidationError('contact type must be one of ' + ', '.join(sorted(CONTACT_TYPES)))
+            user = User(
+                username=username,
+                email=record.get('email') or '',
+                primary_phone=_phone(record.get('primary_phone')),
+                primary_type=primary_type,
+                secondary_phone=_phone(record.get('secondary_phone'), required=False),
+                secondary_type=secondary_type,
+            )
+            _clean_fields(user, ('username', 'email', 'primary_phone', 'secondary_phone'))
+            # Hash only rows that passed validation.
+            user.password = make_password(str(record['password']) if record.get('password') else None)
+        except (ValidationError, ValueError) as e:
+            result.reject(number, _error(e), record)
+            continue
+        taken.add(username)
+        users.append(user)
+
+    if dry_run:
+        result.seen.update(u.username for u in users)
+    elif users:
+        User.objects.bulk_create(users)
+    result.created += len(users)
+
+
+def import_requests(chunk, result, dry_run=False):
+    """Validate and bulk-insert one chunk of media request records.
+
+    Users and already-booked slots are looked up once per chunk, and the
+    chunk's request numbers are reserved as one block.
+    """
+    usernames = {str(record.get('username') or '') for _, record in chunk}
+    users = {u.username: u for u in User.objects.filter(username__in=usernames).only('id', 'username', 'email')}
+
+    requests = []
+    for number, record in chunk:
+        try:
+            user = users.get(str(record.get('username') or ''))
+            if user is None:
+                raise ValidationError('unknown username')
+            location = str(record.get('location') or '')
+            if not location:
+                raise ValidationError('location is required')
+            status = record.get('status') or 'open'
+            if status not in STATUSES:
+                raise ValidationError('status must be one of ' + ', '.join(sorted(STATUSES)))
+            media_req = MediaRequest(
+                user=user,
+                customer_name=record.get('customer_name') or user.username,
+                customer_email=record.get('customer_email') or user.email,
+                customer_phone=_phone(record.get('customer_phone')),
+                date=_date(record.get('date')),
+                time=_time(record.get('time')),
+                location=location,
+                note=record.get('note') or '',
+                status=status,
+            )
+            _clean_fields(media_req, ('customer_name', 'customer_email', 'customer_phone', 'location'))
+            requests.append((number, record, media_req))
+        except (ValidationError, ValueError) as e:
+            result.reject(number, _error(e), record)
+
+    # unique_request_per_slot, checked against the database and within the chunk.
+    booked = set(result.seen)
+    if requests:
+        booked.update(
+            MediaRequest.objects.filter(
+                user_id__in={r.user_id for _, _, r in requests},
+                date__in={r.date for _, _, r in requests},
+                location__in={r.location for _, _, r in requests},
+            ).values_list('user_id', 'date', 'time', 'location')
+        )
+    valid = []
+    for number, record, media_req in requests:
+        slot = (media_req.user_id, media_req.date, media_req.time, media_req.location)
+        if slot in booked:
+            result.reject(number, 'a request for the same date, time and location already exists', record)
+            continue
+        booked.add(slot)
+        valid.append(media_req)
+
+    if dry_run:
+        result.seen.update((r.user_id, r.date, r.time, r.location) for r in valid)
+    elif valid:
+        with transaction.atomic():
+            prefix = timezone.now().strftime('%Y%m%d_%H%M')
+            for media_req, value in zip(valid, RequestNumberSequence.allocate(prefix, len(valid))):
+                media_req.request_number = f"{prefix}_{value:04d}"
+            MediaRequest.objects.bulk_create(valid, batch_size=settings.IMPORT_CHUNK_SIZE)
+    result.created += len(valid)
+
+
+IMPORTERS = {
+    'users': import_users,
+    'requests': import_requests,
+}
+
+
+def import_file(kind, path, chunk_size=None, dry_run=False):
+    """Stream a CSV/XLSX file through the importer for ``kind`` chunk by chunk."""
+    importer = IMPORTERS[kind]
+    result = ImportResult()
+    for chunk in iter_chunks(iter_records(path), chunk_size or settings.IMPORT_CHUNK_SIZE):
+        importer(chunk, result, dry_run=dry_run)
+    return result
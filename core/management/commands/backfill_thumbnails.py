@@ -0,0 +1,22 @@
+import os
+from django.core.management.base import BaseCommand
+from core import thumbnails
+from core.models import MediaRequest, User
+
+
+class Command(BaseCommand):
+    help = 'Generate missing thumbnail variants for every stored profile picture and reference image.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+
+    def handle(self, *args, **options):
+        names = set(User.objects.exclude(profile_picture='').values_list('profile_picture', flat=True))
+        names |= set(
+            MediaRequest.objects.exclude(reference_image='').exclude(reference_image__isnull=True)
+            .values_list('reference_image', flat=True)
+        )
+        storage = User._meta.get_field('profile_picture').storage
+        paths = [path for path in (storage.path(name) for name in sorted(names)) if os.path.exists(path)]
+        written = thumbnails.backfill(paths, workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} variant(s) for {len(paths)} image(s)."))
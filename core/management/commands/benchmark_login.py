@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from core.benchmarking import isolated_database
+from core.models import User
+
+PASSWORD = 'bench-password-123'
+BACKEND_SETUPS = {
+    'single backend': ['core.auth_backend.PhoneOrUsernameBackend'],
+    'ModelBackend first': [
+        'django.contrib.auth.backends.ModelBackend',
+        'core.auth_backend.PhoneOrUsernameBackend',
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure logins per second per worker for username, phone and failed logins.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--attempts', type=int, default=20, help='Logins per scenario.')
+        parser.add_argument('--threads', type=int, default=1,
+                            help='Concurrent threads (1 = one sync gunicorn worker).')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            # Hash once and share it; creating each user with set_password would dominate the run.
+            encoded = make_password(PASSWORD)
+            User.objects.bulk_create(
+                User(username=f'bench{i}', primary_phone=f'+9190000{i:05d}', password=encoded)
+                for i in range(options['users'])
+            )
+            scenarios = {
+                'username': ('bench7', PASSWORD, True),
+                'phone': ('+91 90000 00007', PASSWORD, True),
+                'wrong password': ('+919000000007', 'nope', False),
+                'unknown user': ('nobody', PASSWORD, False),
+            }
+            self.stdout.write(f"{'backends':<20}{'scenario':<16}{'logins/s':>10}{'queries':>9}")
+            for setup, backends in BACKEND_SETUPS.items():
+                with override_settings(AUTHENTICATION_BACKENDS=backends):
+                    for name, (username, password, ok) in scenarios.items():
+                        rate, queries = self.run(username, password, ok, options)
+                        self.stdout.write(f"{setup:<20}{name:<16}{rate:>10.2f}{queries:>9}")
+
+    def run(self, username, password, ok, options):
+        with CaptureQueriesContext(connection) as captured:
+            user = authenticate(None, username=username, password=password)
+        if bool(user) != ok:
+            raise AssertionError(f"Unexpected login result for {username!r}")
+
+        def attempt(_):
+            authenticate(None, username=username, password=password)
+            connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            list(pool.map(attempt, range(options['attempts'])))
+        elapsed = time.perf_counter() - start
+        return options['attempts'] / elapsed, len(captured)
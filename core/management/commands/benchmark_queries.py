@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from core.benchmarking import isolated_database, measure, seed_requests
+from core.models import MediaRequest, User
+
+# Secondary indexes added for the hot lookups; dropped for the "before" run.
+HOT_INDEXES = [
+    (MediaRequest, 'mediarequest_user_created_idx'),
+    (MediaRequest, 'mediarequest_created_idx'),
+    (MediaRequest, 'mediarequest_status_idx'),
+    (User, 'user_primary_phone_idx'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Seed a throwaway database and report the plan and latency of the hot MediaRequest/User '
+            'queries without and with their secondary indexes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--plans', action='store_true', help='Print the full query plans.')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.stdout.write(f"Seeding {options['rows']} requests for {options['users']} users on {connection.vendor}...")
+            users = seed_requests(options['rows'], options['users'], stdout=self.stdout)
+            queries = self.hot_queries(users[len(users) // 2])
+
+            self.set_indexes(present=False)
+            before = self.run(queries, options)
+            self.set_indexes(present=True)
+            after = self.run(queries, options)
+
+        self.stdout.write(f"\n{'query':<28}{'before p50':>12}{'after p50':>12}{'before p95':>12}{'after p95':>12}")
+        for name in queries:
+            b, a = before[name]['timing'], after[name]['timing']
+            self.stdout.write(f"{name:<28}{b['p50']:>10.2f}ms{a['p50']:>10.2f}ms{b['p95']:>10.2f}ms{a['p95']:>10.2f}ms")
+        for label, results in (('before', before), ('after', after)):
+            self.stdout.write(f"\nPlans {label}:")
+            for name, result in results.items():
+                plan = result['plan'] if options['plans'] else result['plan'].splitlines()[0]
+                self.stdout.write(f"  {name}: {plan}")
+
+    def hot_queries(self, user):
+        page = list(MediaRequest.objects.filter(user=user).order_by('-created_at', '-id')[:20])
+        cursor = page[-1]
+        return {
+            'dashboard first page': MediaRequest.objects.filter(user=user).order_by('-created_at', '-id')[:21],
+            'dashboard keyset page': MediaRequest.objects.filter(user=user, created_at__lte=cursor.created_at)
+            .exclude(created_at=cursor.created_at, id__gte=cursor.pk).order_by('-created_at', '-id')[:21],
+            'login by phone': User.objects.filter(primary_phone=user.primary_phone),
+            'admin status filter': MediaRequest.objects.filter(status='open').order_by('-created_at')[:100],
+            'admin status count': MediaRequest.objects.filter(status='open').values('pk'),
+            # No longer on the write path (numbers come from RequestNumberSequence). LIKE can only
+            # use an index on Postgres (Django adds a varchar_pattern_ops "_like" index for unique
+            # CharFields); the equivalent range scan uses the unique index everywhere.
+            'request number LIKE': MediaRequest.objects.filter(request_number__startswith='20000101_0000_000500'),
+            'request number range': MediaRequest.objects.filter(
+                request_number__gte='20000101_0000_000500', request_number__lt='20000101_0000_000501'),
+        }
+
+    def run(self, queries, options):
+        results = {}
+        for name, qs in queries.items():
+            if name.endswith('count'):
+                fn = qs.count
+            else:
+                def fn(qs=qs):
+                    return list(qs.all())
+            results[name] = {'timing': measure(fn, options['repeat']), 'plan': qs.explain()}
+        return results
+
+    def set_indexes(self, present):
+        with connection.schema_editor() as editor:
+            for model, name in HOT_INDEXES:
+                index = next(i for i in model._meta.indexes if i.name == name)
+                if present:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
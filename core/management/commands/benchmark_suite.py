@@ -0,0 +1,253 @@
+import datetime
+import io
+import json
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from PIL import Image
+from core import drive_index, fake_drive
+from core.benchmarking import isolated_database, seed_requests
+from core.models import MediaRequest, SiteSetting, User
+
+PASSWORD = 'bench-password-123'
+PROFILE_FOLDER, REFERENCE_FOLDER, DATA_FOLDER = 'fake-profile-folder', 'fake-reference-folder', 'fake-data-folder'
+SERVER_TIMING_RE = re.compile(r'(\w+);dur=([\d.]+)(?:;desc="(\d+) \w+")?')
+SCENARIOS = ['dashboard', 'dashboard_cold_drive', 'request_create', 'request_create_streamed', 'login',
+             'admin_changelist']
+
+
+def parse_server_timing(value):
+    """Return {'db_ms', 'queries', 'drive_ms', 'drive_calls', 'tpl_ms'} from our Server-Timing header."""
+    parsed = {}
+    for name, duration, count in SERVER_TIMING_RE.findall(value or ''):
+        parsed[f'{name}_ms'] = float(duration)
+        if name == 'db':
+            parsed['queries'] = int(count)
+        elif name == 'drive':
+            parsed['drive_calls'] = int(count)
+    return parsed
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+
+
+class Command(BaseCommand):
+    help = ('Seed throwaway databases at several scales and load-test dashboard, request_create, login and '
+            'the admin changelist against an in-process fake Drive; optionally save or compare JSON baselines.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1000,10000',
+                            help='Comma-separated MediaRequest row counts to seed (one database each).')
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=40, help='Requests per scenario and scale.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Client threads issuing requests.')
+        parser.add_argument('--drive-latency', type=float, default=50.0,
+                            help='Fake Drive latency per HTTP round trip, in milliseconds.')
+        parser.add_argument('--drive-jitter', type=float, default=20.0, help='Extra random latency, in ms.')
+        parser.add_argument('--drive-files', type=int, default=2000,
+                            help='Result files in the fake data folder (paged through on index misses).')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+        parser.add_argument('--save', help='Write the results to this JSON baseline file.')
+        parser.add_argument('--compare', help='Compare against a JSON baseline written by --save.')
+        parser.add_argument('--tolerance', type=float, default=20.0,
+                            help='Percent slowdown (p95) or throughput loss reported as a regression.')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        scenarios = [s for s in options['scenarios'].split(',') if s]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+        scales = [int(s) for s in options['scales'].split(',') if s]
+
+        results = {}
+        media_root = tempfile.TemporaryDirectory(prefix='bench-media-')
+        with media_root, override_settings(
+            ALLOWED_HOSTS=['*'],
+            MEDIA_ROOT=media_root.name,
+            SERVER_TIMING_HEADER=True,
+            SLOW_REQUEST_THRESHOLD_MS=10 ** 9,
+            DRIVE_RESULTS_FROM_SYNC=False,
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                'LOCATION': 'benchmark-suite'}},
+        ):
+            for scale in scales:
+                self.stdout.write(f"\n== {scale} requests, {options['users']} users on {connection.vendor} ==")
+                results[str(scale)] = self.run_scale(scale, scenarios, options)
+
+        baseline = {
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'vendor': connection.vendor,
+            'options': {k: options[k] for k in ('users', 'requests', 'concurrency', 'drive_latency',
+                                                 'drive_jitter', 'drive_files')},
+            'results': results,
+        }
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as fh:
+                json.dump(baseline, fh, indent=2, sort_keys=True)
+            self.stdout.write(f"\nBaseline written to {options['save']}.")
+        if options['compare']:
+            regressions = self.compare(options['compare'], baseline, options['tolerance'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"{regressions} regression(s) beyond {options['tolerance']:.0f}%.")
+
+    # --- one scale -----------------------------------------------------------
+
+    def run_scale(self, scale, scenarios, options):
+        drive = fake_drive.FakeDrive(latency=options['drive_latency'] / 1000, jitter=options['drive_jitter'] / 1000)
+        with isolated_database(), fake_drive.installed(drive):
+            cache.clear()
+            seeded = seed_requests(scale, options['users'])
+            User.objects.filter(pk__in=[u.pk for u in seeded]).update(password=make_password(PASSWORD))
+            # Reload so force_login() hashes the session against the new password.
+            users = list(User.objects.filter(pk__in=[u.pk for u in seeded]).order_by('pk'))
+            staff = User.objects.create(username='bench-staff', primary_phone='+919999999999', is_staff=True,
+                                        is_superuser=True, password=make_password(PASSWORD))
+            SiteSetting.objects.create(drive_profile_folder=PROFILE_FOLDER, drive_reference_folder=REFERENCE_FOLDER,
+                                       drive_data_folder=DATA_FOLDER)
+            SiteSetting.invalidate()
+            numbers = MediaRequest.objects.order_by('-pk').values_list('request_number', flat=True)
+            for number in numbers[:options['drive_files']]:
+                drive.add_file(f"{number}.pdf", DATA_FOLDER)
+
+            results = {}
+            self.stdout.write(f"{'scenario':<26}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}{'queries':>9}"
+                              f"{'db ms':>8}{'drive':>7}{'tpl ms':>8}")
+            for name in scenarios:
+                result = self.run_scenario(name, users, staff, drive, options)
+                results[name] = result
+                self.stdout.write(
+                    f"{name:<26}{result['p50_ms']:>7.1f}ms{result['p95_ms']:>7.1f}ms{result['p99_ms']:>7.1f}ms"
+                    f"{result['throughput_rps']:>9.1f}{result['queries']:>9.1f}{result['db_ms']:>8.1f}"
+                    f"{result['drive_calls']:>7.1f}{result['tpl_ms']:>8.1f}"
+                )
+            return results
+
+    def run_scenario(self, name, users, staff, drive, options):
+        counter = iter(range(10 ** 9))
+        counter_lock = threading.Lock()
+        local = threading.local()
+
+        def client_for(user):
+            # One logged-in Client (and DB connection) per thread, reused across its requests.
+            clients = getattr(local, 'clients', None)
+            if clients is None:
+                clients = local.clients = {}
+            if user.pk not in clients:
+                clients[user.pk] = Client()
+                if name != 'login':
+                    clients[user.pk].force_login(user)
+            return clients[user.pk]
+
+        def one_request(_):
+            with counter_lock:
+                i = next(counter)
+            user = users[i % len(users)]
+            # Clients are created and logged in before the clock starts.
+            if name == 'login':
+                client = Client()
+
+                def call():
+                    return client.post('/login/', {'username': user.primary_phone, 'password': PASSWORD})
+            elif name == 'admin_changelist':
+                client = client_for(staff)
+
+                def call():
+                    return client.get('/admin/core/mediarequest/')
+            elif name.startswith('request_create'):
+                client, form = client_for(user), self.request_form(name, i)
+
+                def call():
+                    return client.post('/request/new/', form)
+            else:
+                client = client_for(user)
+
+                def call():
+                    if name == 'dashboard_cold_drive':
+                        drive_index.invalidate_folder_index(DATA_FOLDER)
+                    return client.get('/')
+
+            start = time.perf_counter()
+            response = call()
+            elapsed = (time.perf_counter() - start) * 1000
+            connection.close()
+            expected = 302 if name == 'login' or name.startswith('request_create') else 200
+            if response.status_code != expected:
+                raise CommandError(f"{name}: expected HTTP {expected}, got {response.status_code}")
+            return elapsed, parse_server_timing(response.get('Server-Timing'))
+
+        keep_local = name != 'request_create_streamed'
+        with override_settings(KEEP_LOCAL_REFERENCE_IMAGES=keep_local):
+            one_request(None)  # warm-up, not measured
+            drive_requests = drive.requests
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                samples = list(pool.map(one_request, range(options['requests'])))
+            wall = time.perf_counter() - start
+
+        latencies = sorted(s[0] for s in samples)
+
+        def mean(key):
+            return sum(s[1].get(key, 0) for s in samples) / len(samples)
+
+        return {
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': latencies[-1],
+            'throughput_rps': len(samples) / wall,
+            'queries': mean('queries'),
+            'db_ms': mean('db_ms'),
+            'drive_calls': mean('drive_calls'),
+            'drive_ms': mean('drive_ms'),
+            'tpl_ms': mean('tpl_ms'),
+            'drive_http_requests': drive.requests - drive_requests,
+        }
+
+    def request_form(self, scenario, i):
+        image = io.BytesIO()
+        Image.new('RGB', (64, 64), ((i * 37) % 256, (i * 91) % 256, (i * 13) % 256)).save(image, 'JPEG')
+        return {
+            'customer_phone': '+919876543210',
+            'date': (datetime.date(2030, 1, 1) + datetime.timedelta(days=i // 24)).isoformat(),
+            'time': f"{i % 24:02d}:30",
+            'location': f"{scenario}-hall-{i}",
+            'note': 'benchmark',
+            'reference_image': SimpleUploadedFile(f'ref{i}.jpg', image.getvalue(), content_type='image/jpeg'),
+        }
+
+    # --- baselines -----------------------------------------------------------
+
+    def compare(self, path, current, tolerance):
+        with open(path, encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        self.stdout.write(f"\nCompared with {path} ({baseline.get('created_at', 'unknown date')}):")
+        self.stdout.write(f"{'scale':>8} {'scenario':<26}{'p50':>9}{'p95':>9}{'req/s':>9}{'queries':>9}")
+        regressions = 0
+        for scale, scenarios in current['results'].items():
+            for name, now in scenarios.items():
+                before = baseline.get('results', {}).get(scale, {}).get(name)
+                if not before:
+                    continue
+
+                def delta(key):
+                    return (now[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+
+                regressed = delta('p95_ms') > tolerance or -delta('throughput_rps') > tolerance
+                regressions += regressed
+                self.stdout.write(
+                    f"{scale:>8} {name:<26}{delta('p50_ms'):>+8.0f}%{delta('p95_ms'):>+8.0f}%"
+                    f"{delta('throughput_rps'):>+8.0f}%{now['queries'] - before['queries']:>+9.1f}"
+                    f"{'  REGRESSION' if regressed else ''}"
+                )
+        return regressions
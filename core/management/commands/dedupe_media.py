@@ -0,0 +1,90 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.models import DriveBlob, DriveUploadJob, MediaRequest, User
+from core.storage import BLOB_DIR, blob_name, digest_from_name
+from core.thumbnails import THUMB_DIR, sha256_file
+
+# (model, file field) pairs whose stored names are rewritten to blob names.
+FILE_FIELDS = [
+    (User, 'profile_picture'),
+    (MediaRequest, 'reference_image'),
+]
+SKIP_DIRS = {BLOB_DIR, THUMB_DIR}
+
+
+class Command(BaseCommand):
+    help = ('Move every file under MEDIA_ROOT into the content-addressed blob store, keeping one copy '
+            'per distinct payload, repointing file fields and recording known Drive copies.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change; touch nothing.')
+        parser.add_argument('--prune', action='store_true',
+                            help='Also delete blobs no User or MediaRequest refers to any more.')
+
+    def handle(self, *args, **options):
+        root = str(settings.MEDIA_ROOT)
+        dry_run = options['dry_run']
+        moved = duplicates = reclaimed = 0
+        planned = set()  # blob names a dry run would have created
+
+        for name in self.legacy_files(root):
+            path = os.path.join(root, name)
+            digest = sha256_file(path)
+            new_name = blob_name(digest, name)
+            new_path = os.path.join(root, new_name)
+            size = os.path.getsize(path)
+            is_duplicate = new_name in planned or os.path.exists(new_path)
+            planned.add(new_name)
+            if is_duplicate:
+                duplicates += 1
+                reclaimed += size
+            moved += 1
+            self.stdout.write(f"{name} -> {new_name}{' (duplicate)' if is_duplicate else ''}")
+            if dry_run:
+                continue
+
+            for model, field in FILE_FIELDS:
+                model.objects.filter(**{field: name}).update(**{field: new_name})
+            # Files already on Drive are remembered so the next identical upload reuses them.
+            for folder_id, drive_file_id in DriveUploadJob.objects.filter(
+                local_path=path, status='done'
+            ).exclude(drive_file_id='').values_list('folder_id', 'drive_file_id'):
+                DriveBlob.remember(digest, folder_id, drive_file_id)
+            DriveUploadJob.objects.filter(local_path=path).update(local_path=new_path)
+
+            if is_duplicate:
+                os.remove(path)
+            else:
+                os.makedirs(os.path.dirname(new_path), exist_ok=True)
+                os.replace(path, new_path)
+
+        verb = 'Would move' if dry_run else 'Moved'
+        self.stdout.write(f"{verb} {moved} file(s); {duplicates} duplicate(s), {reclaimed / 1024 / 1024:.1f} MiB reclaimed.")
+        if options['prune']:
+            self.prune(root, dry_run)
+
+    def legacy_files(self, root):
+        """Yield MEDIA_ROOT-relative names of files stored outside the blob and thumbnail trees."""
+        for dirpath, dirnames, filenames in os.walk(root):
+            if dirpath == root:
+                dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for filename in sorted(filenames):
+                if filename.startswith('.'):
+                    continue
+                yield os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, '/')
+
+    def prune(self, root, dry_run):
+        referenced = set()
+        for model, field in FILE_FIELDS:
+            referenced.update(model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                              .values_list(field, flat=True).iterator())
+        removed = 0
+        for dirpath, _, filenames in os.walk(os.path.join(root, BLOB_DIR)):
+            for filename in filenames:
+                name = os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, '/')
+                if digest_from_name(name) and name not in referenced:
+                    removed += 1
+                    if not dry_run:
+                        os.remove(os.path.join(root, name))
+        self.stdout.write(f"{'Would prune' if dry_run else 'Pruned'} {removed} unreferenced blob(s).")
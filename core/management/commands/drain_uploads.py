@@ -0,0 +1,33 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core import uploads
+
+
+class Command(BaseCommand):
+    help = 'Drain the Drive upload queue with a pool of worker threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.UPLOAD_WORKERS)
+        parser.add_argument('--batch', type=int, default=50, help='Jobs fetched per poll.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once no jobs are due.')
+
+    def handle(self, *args, **options):
+        requeued = uploads.requeue_stale(timedelta(seconds=settings.UPLOAD_STALE_SECONDS))
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s).")
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                jobs = [job for job in uploads.due_jobs(options['batch']) if uploads.claim(job)]
+                if not jobs:
+                    if options['once']:
+                        return
+                    time.sleep(options['interval'])
+                    continue
+                for job in pool.map(uploads.run_job, jobs):
+                    self.stdout.write(f"{job.idempotency_key}: {job.status} (attempt {job.attempts})"
+                                      + (f" - {job.last_error}" if job.last_error else ''))
@@ -0,0 +1,42 @@
+import datetime
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from core import exports
+from core.models import MediaRequest
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}; use YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = 'Export MediaRequests joined with their user to CSV or XLSX in constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--output', help='File to write (CSV defaults to stdout; required for XLSX).')
+        parser.add_argument('--status', choices=[value for value, _ in MediaRequest.REQUEST_STATUS])
+        parser.add_argument('--date-from', type=parse_date, help='First request date to include (YYYY-MM-DD).')
+        parser.add_argument('--date-to', type=parse_date, help='Last request date to include (YYYY-MM-DD).')
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        queryset = exports.filter_requests(
+            MediaRequest.objects.all(), options['status'], options['date_from'], options['date_to']
+        )
+        if options['format'] == 'xlsx':
+            if not options['output']:
+                raise CommandError('--output is required for XLSX exports.')
+            exports.write_xlsx(queryset, options['output'], options['chunk_size'])
+            return
+
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for line in exports.iter_csv(queryset, options['chunk_size']):
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
@@ -0,0 +1,47 @@
+import csv
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core import imports
+
+
+class Command(BaseCommand):
+    help = ('Bulk-import users or media requests from a CSV/XLSX file (header row required), '
+            'validating and inserting in chunks and reporting rejected rows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(imports.IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--rejects', help='Write rejected rows with their reason to this CSV file.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only; insert nothing.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            result = imports.import_file(options['kind'], options['path'], options['chunk_size'], options['dry_run'])
+        except OSError as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+        elapsed = time.perf_counter() - start
+        result.rejected.sort(key=lambda r: r[0])
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(f"{verb} {result.created} {options['kind']} in {elapsed:.1f}s; "
+                          f"{len(result.rejected)} row(s) rejected.")
+        if options['rejects'] and result.rejected:
+            self.write_rejects(options['rejects'], result.rejected)
+        else:
+            for number, reason, _ in result.rejected[:20]:
+                self.stdout.write(f"  row {number}: {reason}")
+            if len(result.rejected) > 20:
+                self.stdout.write('  ... use --rejects FILE for the full list.')
+
+    def write_rejects(self, path, rejected):
+        columns = []
+        for _, _, record in rejected:
+            columns.extend(c for c in record if c not in columns)
+        with open(path, 'w', newline='', encoding='utf-8') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(['row', 'reason'] + columns)
+            for number, reason, record in rejected:
+                writer.writerow([number, reason] + [record.get(c, '') for c in columns])
+        self.stdout.write(f"Rejected rows written to {path}.")
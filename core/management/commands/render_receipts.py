@@ -0,0 +1,34 @@
+import shutil
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core import exports, receipts
+from core.management.commands.export_requests import parse_date
+from core.models import MediaRequest
+
+
+class Command(BaseCommand):
+    help = ('Render (or refresh) PDF receipts for a range of request dates across a process pool, '
+            'optionally merging them into one batch report.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=parse_date, help='First request date to include (YYYY-MM-DD).')
+        parser.add_argument('--date-to', type=parse_date, help='Last request date to include (YYYY-MM-DD).')
+        parser.add_argument('--status', choices=[value for value, _ in MediaRequest.REQUEST_STATUS])
+        parser.add_argument('--workers', type=int, default=settings.RECEIPT_WORKERS,
+                            help='Worker processes (default: one per CPU; 1 renders inline).')
+        parser.add_argument('--report', help='Also write the merged batch report to this path.')
+
+    def handle(self, *args, **options):
+        queryset = exports.filter_requests(
+            MediaRequest.objects.all(), options['status'], options['date_from'], options['date_to']
+        )
+        start = time.perf_counter()
+        if options['report']:
+            title = f"Requests {options['date_from'] or 'start'} to {options['date_to'] or 'today'}"
+            shutil.copyfile(receipts.batch_report(queryset, title, options['workers']), options['report'])
+            self.stdout.write(f"Report for {queryset.count()} request(s) written to {options['report']} "
+                              f"in {time.perf_counter() - start:.1f}s.")
+        else:
+            paths = receipts.render_receipts(queryset.order_by('date', 'time', 'pk'), options['workers'])
+            self.stdout.write(f"{len(paths)} receipt(s) up to date in {time.perf_counter() - start:.1f}s.")
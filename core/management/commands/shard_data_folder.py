@@ -0,0 +1,75 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core import drive_index, drive_shards
+from core.google_drive import MAX_BATCH_SIZE, extract_folder_id, iter_files_in_folder, move_files
+from core.models import SiteSetting
+
+
+class Command(BaseCommand):
+    help = ('Turn on date sharding for the Drive data folder and move its flat result files into '
+            'YYYY/MM subfolders, several Drive batch requests at a time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.DRIVE_SERVICE_POOL_SIZE,
+                            help='Batches moved concurrently (each uses one pooled Drive service).')
+        parser.add_argument('--batch-size', type=int, default=MAX_BATCH_SIZE,
+                            help=f'Files moved per Drive batch request (at most {MAX_BATCH_SIZE}).')
+        parser.add_argument('--dry-run', action='store_true', help='Report how many files would move; touch nothing.')
+
+    def handle(self, *args, **options):
+        site_settings = SiteSetting.objects.first()
+        root_id = extract_folder_id(site_settings.drive_data_folder) if site_settings else None
+        if not root_id:
+            raise CommandError('No Drive data folder is configured in Site Settings.')
+
+        plan = defaultdict(list)
+        skipped = 0
+        for f in iter_files_in_folder(root_id, folders=False):
+            shard = drive_shards.shard_name(os.path.splitext(f['name'])[0])
+            if shard:
+                plan[shard].append(f)
+            else:
+                skipped += 1
+        total = sum(len(files) for files in plan.values())
+        for shard in sorted(plan):
+            self.stdout.write(f"{shard}: {len(plan[shard])} file(s)")
+        self.stdout.write(f"{total} file(s) to move into {len(plan)} shard(s); {skipped} without a request date "
+                          f"stay in the data folder.")
+        if options['dry_run']:
+            return
+
+        # Enable sharding first so the sync daemon follows each file into its shard.
+        if not site_settings.shard_data_folder:
+            site_settings.shard_data_folder = True
+            site_settings.save(update_fields=['shard_data_folder'])
+        shard_ids = {shard: drive_shards.shard_folder_id(root_id, shard, create=True) for shard in sorted(plan)}
+
+        batch_size = max(1, min(options['batch_size'], MAX_BATCH_SIZE))
+        batches = [
+            (shard, files[i:i + batch_size]) for shard, files in plan.items() for i in range(0, len(files), batch_size)
+        ]
+        moved = 0
+        failures = []
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            futures = [pool.submit(self.move_batch, root_id, shard_ids[shard], files) for shard, files in batches]
+            for future in as_completed(futures):
+                done, failed = future.result()
+                moved += done
+                failures.extend(failed)
+                self.stdout.write(f"Moved {moved}/{total}...")
+
+        drive_index.invalidate_folder_index(root_id)
+        for folder_id in shard_ids.values():
+            drive_index.invalidate_folder_index(folder_id)
+        for name, error in failures:
+            self.stderr.write(f"{name}: {error}")
+        self.stdout.write(f"Moved {moved} file(s); {len(failures)} failed (re-run to retry them).")
+
+    @staticmethod
+    def move_batch(root_id, shard_id, files):
+        results = move_files({f['id']: (root_id, shard_id) for f in files})
+        failed = [(f['name'], results[f['id']][1]) for f in files if results[f['id']][1] is not None]
+        return len(files) - len(failed), failed
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from core import drive_sync
+
+
+class Command(BaseCommand):
+    help = ('Follow the Drive changes feed for the data folder and record result files on '
+            'matching MediaRequest rows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=30.0, help='Seconds between polls.')
+        parser.add_argument('--once', action='store_true', help='Run a single pass and exit.')
+        parser.add_argument('--full', action='store_true', help='Rescan the folder instead of resuming.')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            try:
+                self.stdout.write(drive_sync.sync_once(full=full))
+                full = False
+            except Exception as e:
+                if options['once']:
+                    raise
+                self.stderr.write(f"Drive sync failed: {e}")
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,154 @@
+# core/media.py
+
+import glob
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date
+from core.models import MediaRequest, User
+from core.storage import BLOB_DIR, digest_from_name
+from core.thumbnails import THUMB_DIR, _source_digest
+
+THUMB_NAME_RE = re.compile(rf"^{THUMB_DIR}/[0-9a-f]{{2}}/([0-9a-f]{{64}})_\d+x\d+\.[a-z0-9]+$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(name: str):
+    """Return the SHA-256 a blob or thumbnail name is keyed by, or None for any other file."""
+    match = THUMB_NAME_RE.match(name)
+    return match.group(1) if match else digest_from_name(name)
+
+
+def source_names(name: str, media_root, user=None) -> list:
+    """Stored names whose owners may read ``name``: the file itself, or the file(s) a thumbnail was cut from.
+
+    A thumbnail shares its source's hash, so the source is normally a blob
+    named by it. Files saved before content-addressed storage have no blob;
+    for those, ``user``'s own images are hashed (cached by mtime) instead.
+    """
+    match = THUMB_NAME_RE.match(name)
+    if not match:
+        return [name]
+    digest = match.group(1)
+    # The source blob keeps the upload's extension.
+    paths = glob.glob(os.path.join(glob.escape(str(media_root)), BLOB_DIR, digest[:2], f"{digest}*"))
+    if paths:
+        return [os.path.relpath(p, media_root).replace(os.sep, "/") for p in paths]
+    if user is None or not user.is_authenticated or user.is_staff:
+        return []
+    owned = set(MediaRequest.objects.filter(user=user).exclude(reference_image="")
+                .values_list("reference_image", flat=True).distinct())
+    if user.profile_picture:
+        owned.add(user.profile_picture.name)
+    return [n for n in owned if _source_digest(os.path.join(media_root, n)) == digest]
+
+
+def can_read(user, names) -> bool:
+    """Staff read everything; others only their profile picture and their requests' reference images.
+
+    One query: the user's row by primary key, plus an EXISTS probe on the
+    (user, reference_image) index.
+    """
+    if not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+    if not names:
+        return False
+    own_reference = MediaRequest.objects.filter(user=OuterRef("pk"), reference_image__in=names)
+    return User.objects.filter(pk=user.pk).filter(Q(profile_picture__in=names) | Exists(own_reference)).exists()
+
+
+def etag(name: str, stat) -> str:
+    """Strong validator: the content-hashed file name where there is one, else mtime and size."""
+    if content_hash(name):
+        return f'"{os.path.basename(name)}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header: str, size: int):
+    """Return (start, end) inclusive for a single "bytes=" range, "unsatisfiable", or None to send everything.
+
+    Multi-range requests and invalid ranges (last before first) are answered
+    with the whole file, as RFC 9110 allows and requires respectively.
+    """
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        if last and int(last) < int(first):
+            return None
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return "unsatisfiable"
+    return start, end
+
+
+def _read_range(path: str, start: int, length: int):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def media_response(request, name: str, path: str):
+    """Answer a GET/HEAD for a stored file with validators, caching headers and Range support.
+
+    With MEDIA_SENDFILE_HEADER set the body is left to the front-end server
+    (nginx X-Accel-Redirect / Apache X-Sendfile), which then handles ranges.
+    """
+    stat = os.stat(path)
+    tag = etag(name, stat)
+    if content_hash(name):
+        # The bytes behind a content-hashed name can never change.
+        cache_control = f"private, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable"
+    else:
+        cache_control = "private, no-cache"
+    headers = {"ETag": tag, "Cache-Control": cache_control, "Last-Modified": http_date(stat.st_mtime),
+               "Accept-Ranges": "bytes"}
+
+    if_none_match = request.headers.get("If-None-Match", "")
+    if if_none_match.strip() == "*" or tag in [t.strip() for t in if_none_match.split(",")]:
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if settings.MEDIA_SENDFILE_HEADER:
+        response = HttpResponse(content_type=content_type)
+        response[settings.MEDIA_SENDFILE_HEADER] = (
+            path if settings.MEDIA_SENDFILE_HEADER.lower() == "x-sendfile" else settings.MEDIA_SENDFILE_PREFIX + quote(name)
+        )
+    else:
+        byte_range = None
+        # If-Range: only honour the range while the client's copy is still current.
+        if "Range" in request.headers and request.headers.get("If-Range", tag) == tag:
+            byte_range = parse_range(request.headers["Range"], stat.st_size)
+        if byte_range == "unsatisfiable":
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(_read_range(path, start, end - start + 1), status=206,
+                                             content_type=content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            response["Content-Length"] = str(end - start + 1)
+        else:
+            # FileResponse hands the open file to the server's wsgi.file_wrapper (sendfile() under gunicorn).
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+    for header, value in headers.items():
+        response[header] = value
+    return response
@@ -0,0 +1,172 @@
+# core/metrics.py
+
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+from django.template.backends.django import DjangoTemplates, Template
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """Prometheus-style histogram with one series per label value, kept in process memory."""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}  # label value -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float) -> None:
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self, pid: int) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for label_value, values in sorted(series.items()):
+            labels = f'{self.label}="{_escape(label_value)}",worker="{pid}"'
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {values[-2]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {round(values[-1], 6)}")
+            lines.append(f"{self.name}_count{{{labels}}} {values[-2]}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time to produce a response.", "view")
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "Time spent in SQL per request.", "view")
+REQUEST_DB_QUERIES = Histogram("http_request_db_queries", "SQL queries per request.", "view", COUNT_BUCKETS)
+REQUEST_DRIVE_SECONDS = Histogram("http_request_drive_seconds", "Time spent in Drive API helpers per request.",
+                                  "view")
+REQUEST_TEMPLATE_SECONDS = Histogram("http_request_template_seconds", "Time spent rendering templates per request.",
+                                     "view")
+DRIVE_CALL_SECONDS = Histogram("drive_call_seconds", "Latency of core.google_drive helper calls.", "helper")
+HISTOGRAMS = [REQUEST_SECONDS, REQUEST_DB_SECONDS, REQUEST_DB_QUERIES, REQUEST_DRIVE_SECONDS,
+              REQUEST_TEMPLATE_SECONDS, DRIVE_CALL_SECONDS]
+
+
+class RequestTimings:
+    """Per-request totals filled in by the DB wrapper, Drive helpers and template backend."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.drive_calls = 0
+        self.drive_seconds = 0.0
+        self.template_seconds = 0.0
+
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+def start_request() -> contextvars.Token:
+    return _current.set(RequestTimings())
+
+
+def end_request(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def current() -> RequestTimings | None:
+    return _current.get()
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrapper() hook adding each query's time to the current request."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings = _current.get()
+        if timings is not None:
+            timings.db_queries += 1
+            timings.db_seconds += time.perf_counter() - start
+
+
+def _record_drive_call(helper: str, seconds: float) -> None:
+    DRIVE_CALL_SECONDS.observe(helper, seconds)
+    timings = _current.get()
+    if timings is not None:
+        timings.drive_calls += 1
+        timings.drive_seconds += seconds
+
+
+def timed_drive_call(fn):
+    """Time a Drive helper; generator helpers are timed across the whole iteration."""
+    name = fn.__name__
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            elapsed = 0.0
+            iterator = fn(*args, **kwargs)
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - start
+                    yield item
+            finally:
+                iterator.close()
+                _record_drive_call(name, elapsed)
+        return wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _record_drive_call(name, time.perf_counter() - start)
+    return wrapper
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings = _current.get()
+            if timings is not None:
+                timings.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each top-level render (includes are counted once)."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+def render_prometheus() -> str:
+    pid = os.getpid()
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render(pid))
+    return "\n".join(lines) + "\n"
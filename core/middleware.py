@@ -0,0 +1,60 @@
+# core/middleware.py
+
+import logging
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from core import metrics
+
+logger = logging.getLogger("core.performance")
+
+
+class PerformanceMiddleware:
+    """Time each request's SQL, Drive calls and template rendering.
+
+    The totals go out as a Server-Timing header, feed the histograms served
+    at /metrics, and requests slower than SLOW_REQUEST_THRESHOLD_MS are logged.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.db_execute_wrapper))
+                response = self.get_response(request)
+            total = time.perf_counter() - start
+            self.record(request, response, metrics.current(), total)
+        finally:
+            metrics.end_request(token)
+        return response
+
+    def record(self, request, response, timings, total):
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unmatched"
+        metrics.REQUEST_SECONDS.observe(view, total)
+        metrics.REQUEST_DB_SECONDS.observe(view, timings.db_seconds)
+        metrics.REQUEST_DB_QUERIES.observe(view, timings.db_queries)
+        metrics.REQUEST_DRIVE_SECONDS.observe(view, timings.drive_seconds)
+        metrics.REQUEST_TEMPLATE_SECONDS.observe(view, timings.template_seconds)
+
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = ", ".join([
+                f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.db_queries} queries"',
+                f'drive;dur={timings.drive_seconds * 1000:.1f};desc="{timings.drive_calls} calls"',
+                f"tpl;dur={timings.template_seconds * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ])
+        if total * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            logger.warning(
+                "Slow request: %s %s -> %s in %.0f ms (db %.0f ms / %d queries, drive %.0f ms / %d calls, "
+                "templates %.0f ms)",
+                request.method, request.get_full_path(), response.status_code, total * 1000,
+                timings.db_seconds * 1000, timings.db_queries, timings.drive_seconds * 1000,
+                timings.drive_calls, timings.template_seconds * 1000,
+            )
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.24 on 2026-10-17 19:27
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriveUploadJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=255, unique=True)),
+                ('target', models.CharField(choices=[('profile', 'Profile picture'), ('reference', 'Reference image')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('local_path', models.CharField(max_length=500)),
+                ('filename', models.CharField(max_length=255)),
+                ('folder_id', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('drive_file_id', models.CharField(blank=True, max_length=128)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='upload_job_due_idx')],
+            },
+        ),
+    ]
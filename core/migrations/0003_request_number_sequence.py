@@ -0,0 +1,36 @@
+# Generated by Django 4.2.24 on 2026-10-17 19:28
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each minute's counter after the highest number already issued for it."""
+    MediaRequest = apps.get_model('core', 'MediaRequest')
+    RequestNumberSequence = apps.get_model('core', 'RequestNumberSequence')
+    last_values = {}
+    for request_number in MediaRequest.objects.values_list('request_number', flat=True).iterator():
+        prefix, _, suffix = request_number.rpartition('_')
+        if prefix and suffix.isdigit():
+            last_values[prefix] = max(last_values.get(prefix, 0), int(suffix))
+    RequestNumberSequence.objects.bulk_create(
+        RequestNumberSequence(prefix=prefix, last_value=value) for prefix, value in last_values.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_drive_upload_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=13, unique=True)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.24 on 2026-10-17 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_request_number_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriveSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('folder_id', models.CharField(blank=True, max_length=255)),
+                ('page_token', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='mediarequest',
+            name='result_file_id',
+            field=models.CharField(blank=True, db_index=True, max_length=128),
+        ),
+        migrations.AddField(
+            model_name='mediarequest',
+            name='result_file_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
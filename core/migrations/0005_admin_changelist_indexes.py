@@ -0,0 +1,21 @@
+# Generated by Django 4.2.24 on 2026-10-17 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_drive_result_sync'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mediarequest',
+            index=models.Index(fields=['-created_at'], name='mediarequest_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediarequest',
+            index=models.Index(fields=['status', '-created_at'], name='mediarequest_status_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.24 on 2026-10-17 19:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mediarequest',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='mediarequest_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['primary_phone'], name='user_primary_phone_idx'),
+        ),
+    ]
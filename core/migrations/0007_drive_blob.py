@@ -0,0 +1,27 @@
+# Generated by Django 4.2.24 on 2026-10-17 19:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriveBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64)),
+                ('folder_id', models.CharField(max_length=255)),
+                ('drive_file_id', models.CharField(max_length=128)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='driveblob',
+            constraint=models.UniqueConstraint(fields=('sha256', 'folder_id'), name='unique_drive_blob_per_folder'),
+        ),
+    ]
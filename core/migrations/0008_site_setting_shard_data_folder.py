@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-17 20:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_drive_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitesetting',
+            name='shard_data_folder',
+            field=models.BooleanField(default=False, help_text='Look for result files in YYYY/MM subfolders of the data folder (see the shard_data_folder command)'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-17 20:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_site_setting_shard_data_folder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sitesetting',
+            name='drive_archive_folder',
+            field=models.CharField(blank=True, help_text='Drive folder id or full link that "resolve and archive" moves result files into', max_length=255),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_site_setting_drive_archive_folder'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mediarequest',
+            index=models.Index(fields=['user', 'reference_image'], name='mediarequest_user_ref_idx'),
+        ),
+    ]
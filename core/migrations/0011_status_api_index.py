@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_media_authorization_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mediarequest',
+            index=models.Index(fields=['user', 'updated_at'], name='mediarequest_user_updated_idx'),
+        ),
+    ]
@@ -1,10 +1,12 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.core.validators import RegexValidator
 from django.utils import timezone
-import os
 from django.conf import settings
-from core.google_drive import list_files_in_folder
+from django.core.cache import cache
+from core import drive_index, drive_shards
+from core.google_drive import extract_folder_id
 
 phone_validator = RegexValidator(
     r'^\+?[1-9]\d{7,14}$',
@@ -65,6 +67,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['primary_phone']
 
+    class Meta:
+        indexes = [
+            # Phone-number logins look users up by primary_phone.
+            models.Index(fields=['primary_phone'], name='user_primary_phone_idx'),
+        ]
+
     objects = UserManager()
 
     def __str__(self):
@@ -75,10 +83,71 @@ class SiteSetting(models.Model):
     drive_profile_folder = models.CharField(max_length=255, blank=True, help_text='Drive folder id or full link for profile pictures')
     drive_reference_folder = models.CharField(max_length=255, blank=True, help_text='Drive folder id or full link for reference images')
     drive_data_folder = models.CharField(max_length=255, blank=True, help_text='Drive folder id or full link for data files')
+    shard_data_folder = models.BooleanField(
+        default=False,
+        help_text='Look for result files in YYYY/MM subfolders of the data folder (see the shard_data_folder command)',
+    )
+    drive_archive_folder = models.CharField(max_length=255, blank=True, help_text='Drive folder id or full link that "resolve and archive" moves result files into')
+
+    CACHE_KEY = 'site_settings:current'
+    MISSING = 'missing'
 
     def __str__(self):
         return 'Site Settings'
 
+    @classmethod
+    def load(cls):
+        """Return the site settings row (or None), memoized in the cache until it is saved or deleted."""
+        cached = cache.get(cls.CACHE_KEY)
+        if cached is None:
+            cached = cls.objects.first() or cls.MISSING
+            cache.set(cls.CACHE_KEY, cached, timeout=settings.SITE_SETTINGS_CACHE_TTL)
+        return None if cached == cls.MISSING else cached
+
+    @classmethod
+    def invalidate(cls):
+        cache.delete(cls.CACHE_KEY)
+
+    def data_folder_for(self, request_number, create=False):
+        """Return the id of the Drive folder holding a request's result file.
+
+        With sharding on that is the request's YYYY/MM subfolder (None if it
+        does not exist yet, unless ``create``); otherwise the flat data folder.
+        """
+        root_id = extract_folder_id(self.drive_data_folder)
+        shard = drive_shards.shard_name(request_number)
+        if not root_id or not self.shard_data_folder or not shard:
+            return root_id
+        return drive_shards.shard_folder_id(root_id, shard, create=create)
+
+
+class RequestNumberSequence(models.Model):
+    """Per-minute counter behind MediaRequest.request_number (YYYYMMDD_HHMM_0001)."""
+    prefix = models.CharField(max_length=13, unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.prefix}: {self.last_value}"
+
+    @classmethod
+    def allocate(cls, prefix, count=1):
+        """Reserve ``count`` consecutive numbers under ``prefix`` and return them as a range.
+
+        The row is incremented before it is read, so concurrent allocators queue
+        on its write lock instead of racing. Call this inside the transaction
+        that uses the numbers: a rollback hands them back and leaves no gap.
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(prefix=prefix).update(last_value=F('last_value') + count):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(prefix=prefix, last_value=count)
+                except IntegrityError:
+                    # Another transaction created the row first; queue behind it.
+                    cls.objects.filter(prefix=prefix).update(last_value=F('last_value') + count)
+            last = cls.objects.filter(prefix=prefix).values_list('last_value', flat=True).get()
+        return range(last - count + 1, last + 1)
+
 
 class MediaRequest(models.Model):
     REQUEST_STATUS = [('open', 'Open'), ('resolved', 'Resolved')]
@@ -93,6 +162,9 @@ class MediaRequest(models.Model):
     location = models.CharField(max_length=255)
     reference_image = models.FileField(upload_to='references/', blank=True, null=True)
     reference_image_drive_id = models.CharField(max_length=128, blank=True)
+    # Materialized by `manage.py sync_drive_changes` from the data folder's change feed.
+    result_file_id = models.CharField(max_length=128, blank=True, db_index=True)
+    result_file_name = models.CharField(max_length=255, blank=True)
     note = models.TextField(blank=True)
     status = models.CharField(max_length=10, choices=REQUEST_STATUS, default='open')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -102,42 +174,219 @@ class MediaRequest(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['user', 'date', 'time', 'location'], name='unique_request_per_slot')
         ]
+        indexes = [
+            # Dashboard: one user's requests, newest first, continued by (created_at, id) keyset.
+            models.Index(fields=['user', '-created_at', '-id'], name='mediarequest_user_created_idx'),
+            # Admin changelist: default ordering / created_at range filter, and the status filter.
+            models.Index(fields=['-created_at'], name='mediarequest_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='mediarequest_status_idx'),
+            # Media authorization: "is this reference image one of this user's?"
+            models.Index(fields=['user', 'reference_image'], name='mediarequest_user_ref_idx'),
+            # Status API: max(updated_at) per user for ETag/Last-Modified, and ?updated_since= polls.
+            models.Index(fields=['user', 'updated_at'], name='mediarequest_user_updated_idx'),
+        ]
         ordering = ['-created_at']
 
     def save(self, *args, **kwargs):
-        if not self.request_number:
-            now = timezone.now()
-            prefix = now.strftime('%Y%m%d_%H%M')
-            existing = MediaRequest.objects.filter(request_number__startswith=prefix).count() + 1
-            self.request_number = f"{prefix}_{existing:04d}"
-        super().save(*args, **kwargs)
+        if self.request_number:
+            return super().save(*args, **kwargs)
+
+        # Allocate and insert in one transaction so a failed insert releases its number.
+        try:
+            with transaction.atomic(using=kwargs.get('using')):
+                prefix = timezone.now().strftime('%Y%m%d_%H%M')
+                number = RequestNumberSequence.allocate(prefix)[0]
+                self.request_number = f"{prefix}_{number:04d}"
+                super().save(*args, **kwargs)
+        except Exception:
+            self.request_number = ''
+            raise
 
     def __str__(self):
         return f"{self.request_number} ({self.get_status_display()})"
 
+    @classmethod
+    def stats_for_user(cls, user_id):
+        """Return the dashboard counters for a user from one aggregate query.
+
+        "With files" counts results the same way the cards link them: synced
+        ids, plus (unless DRIVE_RESULTS_FROM_SYNC) the unsynced requests found
+        in the memoized data folder index.
+        """
+        rows = cls.objects.filter(user_id=user_id)
+        stats = rows.aggregate(
+            total=Count('id'),
+            resolved=Count('id', filter=Q(status='resolved')),
+            open=Count('id', filter=Q(status='open')),
+            with_files=Count('id', filter=~Q(result_file_id='')),
+        )
+        if not settings.DRIVE_RESULTS_FROM_SYNC and stats['with_files'] < stats['total']:
+            find = cls._index_finder()
+            unsynced = rows.filter(result_file_id='').values_list('request_number', flat=True)
+            stats['with_files'] += sum(1 for number in unsynced.iterator() if find(number))
+        return stats
+
     # 🔑 NEW METHODS
-    def get_drive_file(self):
-        """Return Google Drive file dict if a matching file exists (request_number + ext)."""
-        from core.models import SiteSetting  # avoid circular import
+    @staticmethod
+    def drive_view_link(file_id):
+        return f"https://drive.google.com/file/d/{file_id}/view?usp=sharing"
 
+    @staticmethod
+    def get_data_folder_index(request_number=None):
+        """Return the stem index of the data folder, or of the request's date shard ({} if unset or unreachable)."""
         try:
-            site_settings = SiteSetting.objects.first()
-            folder_id = site_settings.drive_data_folder
+            site_settings = SiteSetting.load()
+            folder_id = site_settings.data_folder_for(request_number)
             if not folder_id:
-                return None
+                return {}
+            return drive_index.get_folder_index(folder_id)
+        except Exception:
+            return {}
 
-            files = list_files_in_folder(folder_id)
-            for f in files:
-                filename, ext = os.path.splitext(f["name"])
-                if filename == str(self.request_number):
-                    return f  # {"id": "...", "name": "..."}
+    @classmethod
+    def _index_finder(cls):
+        """Return a function mapping a request number to its data folder index entry, one index per folder (or shard)."""
+        site_settings = SiteSetting.load()
+        sharded = bool(site_settings and site_settings.shard_data_folder)
+        indexes = {}
+
+        def find(request_number):
+            shard = drive_shards.shard_name(request_number) if sharded else None
+            if shard not in indexes:
+                indexes[shard] = cls.get_data_folder_index(request_number)
+            return indexes[shard].get(str(request_number))
+        return find
+
+    @classmethod
+    def with_drive_files(cls, requests):
+        """Pair each request with its result file dict (or None) using at most one listing per folder (or shard)."""
+        find = None
+        pairs = []
+        for r in requests:
+            f = r.get_synced_drive_file()
+            if f is None and not settings.DRIVE_RESULTS_FROM_SYNC:
+                find = find or cls._index_finder()
+                f = find(r.request_number)
+            pairs.append((r, f))
+        return pairs
+
+    @classmethod
+    def drive_links_version(cls, request_numbers):
+        """Return a token that changes when index-derived result links may have changed ('' when links are synced only).
+
+        It joins the index versions of the folders the unsynced requests'
+        results would be found in. ``request_numbers`` (any lazy iterable of
+        their numbers, or of "YYYYMMDD_" prefixes) is only read when the data
+        folder is sharded.
+        """
+        if settings.DRIVE_RESULTS_FROM_SYNC:
+            return ''
+        try:
+            site_settings = SiteSetting.load()
+            if not site_settings:
+                return ''
+            if site_settings.shard_data_folder:
+                folder_ids = {site_settings.data_folder_for(number) for number in request_numbers}
+            else:
+                folder_ids = {site_settings.data_folder_for(None)}
+            return '.'.join(drive_index.folder_version(folder_id) for folder_id in sorted(filter(None, folder_ids)))
         except Exception:
-            return None
+            return ''
+
+    @classmethod
+    def with_drive_links(cls, requests):
+        """Pair each request with its Drive view link (see with_drive_files)."""
+        return [(r, cls.drive_view_link(f["id"]) if f else None) for r, f in cls.with_drive_files(requests)]
+
+    def get_synced_drive_file(self):
+        """Return the result file recorded by the Drive sync daemon, without calling Drive."""
+        if self.result_file_id:
+            return {"id": self.result_file_id, "name": self.result_file_name}
         return None
 
+    def get_drive_file(self):
+        """Return Google Drive file dict if a matching file exists (request_number + ext)."""
+        synced = self.get_synced_drive_file()
+        if synced or settings.DRIVE_RESULTS_FROM_SYNC:
+            return synced
+        return self.get_data_folder_index(self.request_number).get(str(self.request_number))  # {"id": "...", "name": "..."}
+
     def get_drive_file_link(self):
         """Return a Google Drive view link if matching file exists."""
         f = self.get_drive_file()
         if f:
-            return f"https://drive.google.com/file/d/{f['id']}/view?usp=sharing"
+            return self.drive_view_link(f["id"])
         return None
+
+
+class DriveSyncState(models.Model):
+    """Resume point of a Drive changes feed consumer."""
+    key = models.CharField(max_length=64, unique=True)
+    folder_id = models.CharField(max_length=255, blank=True)
+    page_token = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.key
+
+
+class DriveUploadJob(models.Model):
+    """A queued upload of a locally stored file to Drive, drained by `manage.py drain_uploads`."""
+    STATUS = [('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')]
+    TARGETS = [('profile', 'Profile picture'), ('reference', 'Reference image')]
+
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    target = models.CharField(max_length=20, choices=TARGETS)
+    object_id = models.PositiveBigIntegerField()
+    local_path = models.CharField(max_length=500)
+    filename = models.CharField(max_length=255)
+    folder_id = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    drive_file_id = models.CharField(max_length=128, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='upload_job_due_idx'),
+        ]
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_status_display()})"
+
+
+class DriveBlob(models.Model):
+    """Drive copy of a stored payload, so identical content is uploaded to a folder only once.
+
+    Later owners of the same content get a server-side copy of this file
+    under their own name (see uploads.copy_existing), never its id.
+    """
+    sha256 = models.CharField(max_length=64)
+    folder_id = models.CharField(max_length=255)
+    drive_file_id = models.CharField(max_length=128)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sha256', 'folder_id'], name='unique_drive_blob_per_folder')
+        ]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} in {self.folder_id}"
+
+    @classmethod
+    def lookup(cls, sha256, folder_id):
+        """Return the Drive file id already holding this content in the folder, or None."""
+        return cls.objects.filter(sha256=sha256, folder_id=folder_id).values_list('drive_file_id', flat=True).first()
+
+    @classmethod
+    def remember(cls, sha256, folder_id, drive_file_id):
+        cls.objects.get_or_create(sha256=sha256, folder_id=folder_id, defaults={'drive_file_id': drive_file_id})
+
+    @classmethod
+    def forget(cls, sha256, folder_id):
+        cls.objects.filter(sha256=sha256, folder_id=folder_id).delete()
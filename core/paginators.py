@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that uses Postgres' planner estimate instead of COUNT(*) on large unfiltered tables.
+
+    Filtered changelists (search, status, date hierarchy) still get an exact
+    count, which their indexes keep cheap.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[getattr(queryset, 'db', 'default')]
+        if connection.vendor == 'postgresql' and hasattr(queryset, 'query') and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
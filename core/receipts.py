@@ -0,0 +1,196 @@
+# core/receipts.py
+
+import glob
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+from core.thumbnails import _source_digest, render_thumbnail, thumbnail_name
+
+RECEIPT_FIELDS = [
+    ('Request number', 'request_number'),
+    ('Status', 'status'),
+    ('Date', 'date'),
+    ('Time', 'time'),
+    ('Location', 'location'),
+    ('Customer name', 'customer_name'),
+    ('Customer phone', 'customer_phone'),
+    ('Customer email', 'customer_email'),
+    ('Note', 'note'),
+    ('Requested at', 'created_at'),
+]
+
+
+def _text(value) -> str:
+    # fpdf 1.7 core fonts are latin-1 only.
+    return str(value if value is not None else '').encode('latin-1', 'replace').decode('latin-1')
+
+
+def _version(dt) -> str:
+    return str(int(dt.timestamp() * 1_000_000))
+
+
+def _path_version(path: str) -> int:
+    try:
+        return int(os.path.splitext(os.path.basename(path))[0].rpartition('-')[2])
+    except ValueError:
+        return 0
+
+
+def receipt_data(media_req) -> dict:
+    """Snapshot a request as a plain dict a worker process can render without the ORM."""
+    data = {
+        'request_number': media_req.request_number,
+        'status': media_req.get_status_display(),
+        'date': media_req.date.strftime('%d %b %Y'),
+        'time': media_req.time.strftime('%H:%M'),
+        'location': media_req.location,
+        'customer_name': media_req.customer_name,
+        'customer_phone': media_req.customer_phone,
+        'customer_email': media_req.customer_email,
+        'note': media_req.note,
+        'created_at': timezone.localtime(media_req.created_at).strftime('%d %b %Y %H:%M'),
+        'image_path': None,
+        'thumb_path': None,
+        'thumb_size': settings.THUMBNAIL_SIZES['card'],
+        'thumb_quality': settings.THUMBNAIL_QUALITY,
+        # Cached PDFs are named by updated_at, so any change to the row renders a new one.
+        'path': os.path.join(str(settings.RECEIPT_CACHE_DIR),
+                             f"{media_req.request_number}-{_version(media_req.updated_at)}.pdf"),
+    }
+    if media_req.reference_image:
+        try:
+            src_path = media_req.reference_image.path
+        except (NotImplementedError, ValueError):
+            src_path = None
+        digest = _source_digest(src_path) if src_path else None
+        if digest:
+            data['image_path'] = src_path
+            data['thumb_path'] = os.path.join(
+                str(settings.MEDIA_ROOT), thumbnail_name(digest, settings.THUMBNAIL_SIZES['card'], 'jpeg'))
+    return data
+
+
+def render_receipt(data: dict) -> str:
+    """Write one receipt PDF and drop older versions of it; returns its path.
+
+    The PDF appears under its final name atomically, and only versions older
+    than this one are removed, so a slow render never deletes a newer receipt.
+
+    Takes and returns plain values so it can run in a worker process.
+    """
+    # Imported on first render so web workers that never serve a receipt skip them.
+    from fpdf import FPDF
+
+    if data['thumb_path'] and not os.path.exists(data['thumb_path']):
+        try:
+            render_thumbnail(data['image_path'], data['thumb_path'], data['thumb_size'], 'jpeg',
+                             data['thumb_quality'])
+        except OSError:
+            data = dict(data, thumb_path=None)
+
+    pdf = FPDF(format='A5')
+    pdf.set_auto_page_break(True, margin=12)
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, 'Media Request Receipt', ln=1)
+    pdf.set_font('Arial', '', 10)
+    for label, key in RECEIPT_FIELDS:
+        if not data[key]:
+            continue
+        pdf.set_font('Arial', 'B', 10)
+        pdf.cell(35, 6, _text(label))
+        pdf.set_font('Arial', '', 10)
+        pdf.multi_cell(0, 6, _text(data[key]))
+    if data['thumb_path']:
+        pdf.ln(4)
+        pdf.image(data['thumb_path'], w=60)
+
+    os.makedirs(os.path.dirname(data['path']), exist_ok=True)
+    tmp_path = f"{data['path']}.{os.getpid()}.tmp"
+    pdf.output(tmp_path, 'F')
+    os.replace(tmp_path, data['path'])
+    version = _path_version(data['path'])
+    for old in glob.glob(os.path.join(os.path.dirname(data['path']), f"{data['request_number']}-*.pdf")):
+        if _path_version(old) < version:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return data['path']
+
+
+def open_receipt(media_req):
+    """Open the cached receipt for a request, rendering it in this process if it is stale.
+
+    A concurrent render of a newer version may delete this one between the
+    existence check and the open; it is then rendered once more.
+    """
+    data = receipt_data(media_req)
+    path = data['path'] if os.path.exists(data['path']) else render_receipt(data)
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        return open(render_receipt(data), 'rb')
+
+
+def render_receipts(requests, workers: int = None) -> list:
+    """Return receipt paths for many requests, rendering the stale ones across a process pool."""
+    items = [receipt_data(r) for r in requests]
+    missing = [data for data in items if not os.path.exists(data['path'])]
+    if len(missing) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(render_receipt, missing, chunksize=8))
+    else:
+        for data in missing:
+            render_receipt(data)
+    return [data['path'] for data in items]
+
+
+def _summary_page(title: str, rows: list) -> io.BytesIO:
+    from fpdf import FPDF
+
+    pdf = FPDF(format='A5')
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, _text(title), ln=1)
+    pdf.set_font('Arial', '', 10)
+    for label, value in rows:
+        pdf.cell(35, 6, _text(label))
+        pdf.cell(0, 6, _text(value), ln=1)
+    return io.BytesIO(pdf.output(dest='S').encode('latin-1'))
+
+
+def batch_report(queryset, title: str, workers: int = None) -> str:
+    """Merge the receipts of every request in ``queryset`` behind a summary page.
+
+    The merged file is cached under a key built from the row count and the
+    newest updated_at, so an unchanged range is served without re-rendering.
+    """
+    summary = queryset.aggregate(total=Count('id'), latest=Max('updated_at'))
+    key = hashlib.sha1(f"{title}:{queryset.query}:{summary['total']}:{summary['latest']}".encode()).hexdigest()
+    path = os.path.join(str(settings.RECEIPT_CACHE_DIR), 'reports', f"{key}.pdf")
+    if os.path.exists(path):
+        return path
+
+    from PyPDF2 import PdfWriter
+
+    requests = list(queryset.order_by('date', 'time', 'pk'))
+    paths = render_receipts(requests, workers)
+    status_counts = {}
+    for r in requests:
+        status_counts[r.get_status_display()] = status_counts.get(r.get_status_display(), 0) + 1
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    writer = PdfWriter()
+    writer.append(_summary_page(title, [('Requests', len(requests))] + sorted(status_counts.items())))
+    for receipt in paths:
+        writer.append(receipt)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        writer.write(fh)
+    os.replace(tmp_path, path)
+    return path
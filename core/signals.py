@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import MediaRequest, SiteSetting, User
+from .thumbnails import generate_for_field
+
+
+def _image_saved(field_name, raw=False, update_fields=None, **kwargs):
+    """False for fixture loads and for partial saves (e.g. last_login on login) that leave the image alone."""
+    return not raw and (update_fields is None or field_name in update_fields)
+
+
+@receiver(post_save, sender=User)
+def user_thumbnails(sender, instance, **kwargs):
+    if _image_saved('profile_picture', **kwargs):
+        generate_for_field(instance.profile_picture)
+
+
+@receiver(post_save, sender=MediaRequest)
+def reference_thumbnails(sender, instance, **kwargs):
+    if _image_saved('reference_image', **kwargs):
+        generate_for_field(instance.reference_image)
+
+
+@receiver([post_save, post_delete], sender=SiteSetting)
+def site_settings_changed(sender, **kwargs):
+    SiteSetting.invalidate()
+
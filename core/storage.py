@@ -0,0 +1,78 @@
+# core/storage.py
+
+import hashlib
+import os
+import re
+import tempfile
+from django.core.files.storage import FileSystemStorage
+
+BLOB_DIR = "blobs"
+BLOB_NAME_RE = re.compile(rf"^{BLOB_DIR}/[0-9a-f]{{2}}/([0-9a-f]{{64}})(\.[a-z0-9]+)?$")
+
+
+def blob_name(digest: str, original_name: str = "") -> str:
+    """Storage name of a payload: its SHA-256 plus the original (lowercased) extension."""
+    ext = os.path.splitext(original_name)[1].lower()
+    return f"{BLOB_DIR}/{digest[:2]}/{digest}{ext}"
+
+
+def digest_from_name(name: str):
+    """Return the SHA-256 encoded in a blob name, or None for any other stored file."""
+    match = BLOB_NAME_RE.match(name or "")
+    return match.group(1) if match else None
+
+
+def content_digest(content) -> str:
+    """SHA-256 of an uploaded file, read in chunks and rewound for the next reader."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Media storage that keeps one copy of each distinct payload under blobs/xx/<sha256>.ext.
+
+    Saving a file already stored returns the existing blob's name without
+    writing anything, so repeat uploads share one file (and one Drive copy).
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save(); never suffix it.
+        return name
+
+    def _save(self, name, content):
+        blob_dir = self.path(BLOB_DIR)
+        os.makedirs(blob_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        # Hash while spooling to a temp file next to the blobs, so the payload is read once.
+        fd, tmp_path = tempfile.mkstemp(dir=blob_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            name = blob_name(digest.hexdigest(), name)
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp_path, self.file_permissions_mode)
+                # Identical content, so a concurrent writer replacing it is harmless.
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+    def delete(self, name):
+        # Blobs may be shared by several rows; leave them for `manage.py dedupe_media --prune`.
+        if not digest_from_name(name):
+            super().delete(name)
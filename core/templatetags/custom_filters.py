@@ -1,4 +1,5 @@
 from django import template
+from core.thumbnails import get_thumbnail_url
 
 register = template.Library()
 
@@ -6,3 +7,9 @@ register = template.Library()
 def get_item(dictionary, key):
     return dictionary.get(key)
 
+
+@register.filter
+def thumbnail(field_file, spec):
+    """URL of a resized variant, e.g. {{ image|thumbnail:"card" }} or {{ image|thumbnail:"card:webp" }}."""
+    size_name, _, fmt = spec.partition(':')
+    return get_thumbnail_url(field_file, size_name, fmt or 'jpeg')
@@ -0,0 +1,48 @@
+import datetime
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection
+from django.test import TransactionTestCase
+from core.models import MediaRequest, User
+
+
+class RequestNumberConcurrencyTests(TransactionTestCase):
+    """Request numbers created from many threads at once have no duplicates and no gaps."""
+
+    threads = 8
+    per_thread = 10
+
+    def create_requests(self, threads, per_thread):
+        user = User.objects.create_user('stress', password=None, primary_phone='+919876543210')
+        start = threading.Barrier(threads)
+
+        def create(worker):
+            start.wait()
+            created = []
+            try:
+                for i in range(per_thread):
+                    media_req = MediaRequest(
+                        user=user, customer_name='stress', customer_phone='+919876543210',
+                        date=datetime.date.today(), time=datetime.time(9, 0), location=f"{worker}-{i}",
+                    )
+                    media_req.save()
+                    created.append(media_req.request_number)
+            finally:
+                connection.close()
+            return created
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            return [number for created in pool.map(create, range(threads)) for number in created]
+
+    def test_concurrent_request_numbers_are_unique_and_gap_free(self):
+        numbers = self.create_requests(self.threads, self.per_thread)
+
+        self.assertEqual(len(numbers), self.threads * self.per_thread)
+        self.assertEqual(len(set(numbers)), len(numbers), 'duplicate request numbers were issued')
+        by_prefix = defaultdict(list)
+        for number in numbers:
+            prefix, _, suffix = number.rpartition('_')
+            by_prefix[prefix].append(int(suffix))
+        for prefix, values in by_prefix.items():
+            self.assertEqual(sorted(values), list(range(1, len(values) + 1)), f'gap in the sequence for {prefix}')
@@ -0,0 +1,133 @@
+# core/thumbnails.py
+
+import functools
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+THUMB_DIR = "thumbs"
+FORMATS = {"jpeg": "jpg", "webp": "webp"}
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path: str) -> str:
+    """Hash a file in fixed-size chunks so large images never sit in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def thumbnail_name(digest: str, size: tuple, fmt: str) -> str:
+    """Storage name of a variant; content-addressed, so identical uploads share it."""
+    width, height = size
+    return f"{THUMB_DIR}/{digest[:2]}/{digest}_{width}x{height}.{FORMATS[fmt]}"
+
+
+def render_thumbnail(src_path: str, dest_path: str, size: tuple, fmt: str, quality: int) -> None:
+    """Write a resized copy of an image, decoding JPEGs at reduced scale where possible."""
+    with Image.open(src_path) as img:
+        # draft() lets the JPEG decoder skip straight to a nearby 1/2, 1/4 or 1/8 scale.
+        img.draft("RGB", (size[0] * 2, size[1] * 2))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.thumbnail(size, Image.LANCZOS)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+        img.save(tmp_path, format=fmt.upper(), quality=quality, optimize=True)
+    os.replace(tmp_path, dest_path)
+
+
+def generate_variants(src_path: str, media_root: str, sizes: dict, quality: int) -> int:
+    """Create every missing size/format variant of one image; returns how many were written.
+
+    Takes plain arguments so it can run in a worker process for backfills.
+    """
+    try:
+        digest = sha256_file(src_path)
+        written = 0
+        for size in sizes.values():
+            for fmt in FORMATS:
+                dest_path = os.path.join(media_root, thumbnail_name(digest, size, fmt))
+                if not os.path.exists(dest_path):
+                    render_thumbnail(src_path, dest_path, size, fmt, quality)
+                    written += 1
+        return written
+    except (OSError, UnidentifiedImageError):
+        return 0
+
+
+def _source_digest(path: str):
+    """Return the content hash of a stored image, or None if it is missing or not an image.
+
+    Results are cached by path, size and mtime so page renders do not re-read
+    the original.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = "thumb_src:" + hashlib.md5(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+    digest = cache.get(key)
+    if digest is None:
+        try:
+            with Image.open(path) as img:
+                img.verify()
+            digest = sha256_file(path)
+        except (OSError, UnidentifiedImageError):
+            digest = ""
+        cache.set(key, digest, timeout=None)
+    return digest or None
+
+
+def get_thumbnail_url(field_file, size_name: str, fmt: str = "jpeg"):
+    """Return the URL of a cached variant of an image field, generating it on first use."""
+    if not field_file:
+        return None
+    try:
+        src_path = field_file.path
+    except (NotImplementedError, ValueError):
+        return None
+    digest = _source_digest(src_path)
+    if not digest:
+        return None
+    name = thumbnail_name(digest, settings.THUMBNAIL_SIZES[size_name], fmt)
+    if not default_storage.exists(name):
+        render_thumbnail(src_path, default_storage.path(name), settings.THUMBNAIL_SIZES[size_name], fmt,
+                         settings.THUMBNAIL_QUALITY)
+    return default_storage.url(name)
+
+
+def generate_for_field(field_file) -> int:
+    """Generate every missing variant of an uploaded image in the current process."""
+    if not field_file:
+        return 0
+    digest = _source_digest(field_file.path)
+    if not digest:
+        return 0
+    written = 0
+    for size in settings.THUMBNAIL_SIZES.values():
+        for fmt in FORMATS:
+            name = thumbnail_name(digest, size, fmt)
+            if not default_storage.exists(name):
+                try:
+                    render_thumbnail(field_file.path, default_storage.path(name), size, fmt,
+                                     settings.THUMBNAIL_QUALITY)
+                except (OSError, UnidentifiedImageError):
+                    return written
+                written += 1
+    return written
+
+
+def backfill(paths, workers: int = None) -> int:
+    """Generate variants for many stored images across a process pool."""
+    task = functools.partial(generate_variants, media_root=str(settings.MEDIA_ROOT),
+                             sizes=settings.THUMBNAIL_SIZES, quality=settings.THUMBNAIL_QUALITY)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(task, paths, chunksize=16))
@@ -0,0 +1,133 @@
+# core/uploads.py
+
+import hashlib
+import os
+import random
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from core.google_drive import copy_file, create_drive_file, find_file_by_app_property
+from core.models import DriveBlob, DriveUploadJob, MediaRequest
+from core.storage import digest_from_name
+from core.thumbnails import sha256_file
+
+# Drive appProperties entries are limited to 124 bytes, so files are tagged
+# with a digest of the job's idempotency key rather than the key itself.
+APP_PROPERTY_KEY = "upload_key"
+
+
+def enqueue_upload(target: str, object_id: int, local_path: str, filename: str, folder_id: str) -> DriveUploadJob:
+    """Queue an upload; enqueueing the same target/object/filename twice returns the existing job."""
+    job, _ = DriveUploadJob.objects.get_or_create(
+        idempotency_key=f"{target}:{object_id}:{filename}",
+        defaults={
+            "target": target,
+            "object_id": object_id,
+            "local_path": local_path,
+            "filename": filename,
+            "folder_id": folder_id,
+        },
+    )
+    return job
+
+
+def due_jobs(limit: int = 50):
+    """Return pending jobs whose next attempt is due, oldest first."""
+    return list(
+        DriveUploadJob.objects.filter(status="pending", next_attempt_at__lte=timezone.now())
+        .order_by("next_attempt_at", "id")[:limit]
+    )
+
+
+def claim(job: DriveUploadJob) -> bool:
+    """Atomically move a job from pending to running; False if another worker got it first."""
+    claimed = DriveUploadJob.objects.filter(pk=job.pk, status="pending").update(
+        status="running", attempts=job.attempts + 1, updated_at=timezone.now()
+    )
+    if claimed:
+        job.status = "running"
+        job.attempts += 1
+    return bool(claimed)
+
+
+def requeue_stale(older_than: timedelta) -> int:
+    """Return jobs left running by a crashed worker to the queue."""
+    return DriveUploadJob.objects.filter(
+        status="running", updated_at__lt=timezone.now() - older_than
+    ).update(status="pending", next_attempt_at=timezone.now())
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """Exponential backoff with jitter: base * 2^(attempts-1), capped."""
+    base = settings.UPLOAD_RETRY_BASE_SECONDS
+    delay = min(base * 2 ** max(attempts - 1, 0), settings.UPLOAD_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _write_back(job: DriveUploadJob) -> None:
+    if job.target == "reference":
+        MediaRequest.objects.filter(pk=job.object_id).update(reference_image_drive_id=job.drive_file_id)
+
+
+def _content_digest(path: str) -> str:
+    # Blob names already carry their SHA-256; only legacy files need hashing.
+    name = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+    return digest_from_name(name) or sha256_file(path)
+
+
+def copy_existing(digest: str, filename: str, folder_id: str, app_properties: dict | None = None):
+    """Copy the folder's Drive file with this content under ``filename``; None if there is none to copy.
+
+    Each owner gets its own, correctly named file; the bytes are not sent again.
+    """
+    from googleapiclient.errors import HttpError
+
+    source_id = DriveBlob.lookup(digest, folder_id)
+    if not source_id:
+        return None
+    try:
+        return copy_file(source_id, filename, folder_id, app_properties=app_properties)
+    except HttpError as e:
+        if e.resp.status != 404:
+            raise
+        # The remembered file was deleted on Drive; upload afresh.
+        DriveBlob.forget(digest, folder_id)
+        return None
+
+
+def _upload(job: DriveUploadJob) -> str:
+    digest = _content_digest(job.local_path)
+    app_properties = {APP_PROPERTY_KEY: hashlib.sha1(job.idempotency_key.encode()).hexdigest()}
+    existing = None
+    if job.attempts > 1:
+        # A previous attempt may have reached Drive before failing locally.
+        existing = find_file_by_app_property(job.folder_id, APP_PROPERTY_KEY, app_properties[APP_PROPERTY_KEY])
+    if existing:
+        file_id = existing["id"]
+    else:
+        file_id = copy_existing(digest, job.filename, job.folder_id, app_properties) or create_drive_file(
+            job.local_path, job.filename, job.folder_id, app_properties=app_properties
+        )
+    DriveBlob.remember(digest, job.folder_id, file_id)
+    return file_id
+
+
+def run_job(job: DriveUploadJob) -> DriveUploadJob:
+    """Upload a claimed job's file and record the outcome, scheduling a retry on failure."""
+    try:
+        if not settings.GOOGLE_DRIVE_CREDENTIALS_INFO:
+            raise RuntimeError("Google Drive credentials are not configured in settings.py.")
+        if not job.drive_file_id:
+            job.drive_file_id = _upload(job)
+        _write_back(job)
+        job.status = "done"
+        job.last_error = ""
+    except Exception as e:
+        job.last_error = str(e)
+        if job.attempts >= settings.UPLOAD_MAX_ATTEMPTS:
+            job.status = "failed"
+        else:
+            job.status = "pending"
+            job.next_attempt_at = timezone.now() + backoff_delay(job.attempts)
+    job.save(update_fields=["status", "drive_file_id", "last_error", "next_attempt_at", "updated_at"])
+    return job
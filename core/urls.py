@@ -8,4 +8,8 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('request/new/', views.request_create, name='request_create'),
+    path('request/<str:request_number>/receipt/', views.request_receipt, name='request_receipt'),
+    path('api/requests/', views.requests_status, name='requests_status'),
+    path('api/requests/<str:request_number>/', views.request_status, name='request_status'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
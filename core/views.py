@@ -1,12 +1,30 @@
+import functools
 import os
-from django.shortcuts import render, redirect
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max, Q
+from django.db.models.functions import Substr
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from django.utils.crypto import constant_time_compare
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_safe
 from django.conf import settings
+from . import media, metrics
 from .forms import RegisterForm, LoginForm, MediaRequestForm
-from .models import MediaRequest, SiteSetting
-from .google_drive import extract_folder_id, upload_file_to_drive
+from .models import DriveBlob, MediaRequest, SiteSetting
+from .receipts import open_receipt
+from .storage import content_digest
+from .google_drive import create_drive_file_from_stream, extract_folder_id
+from .uploads import copy_existing, enqueue_upload
 
 
 def register_view(request):
@@ -14,17 +32,18 @@ def register_view(request):
         form = RegisterForm(request.POST, request.FILES)
         if form.is_valid():
             user = form.save()
-            # upload profile picture to drive folder if configured
+            # queue the profile picture for upload to the drive folder if configured
             try:
-                settings_obj = SiteSetting.objects.first()
+                settings_obj = SiteSetting.load()
                 folder_link = settings_obj.drive_profile_folder or settings.GDRIVE_PROFILE_FOLDER_ID if settings_obj else settings.GDRIVE_PROFILE_FOLDER_ID
                 folder_id = extract_folder_id(folder_link)
                 if user.profile_picture and folder_id:
-                    local_path = user.profile_picture.path
-                    filename = f"{user.username}_{os.path.basename(local_path)}"
-                    upload_file_to_drive(local_path, filename, folder_id)
+                    # The stored name is the content hash; Drive gets the name the file was uploaded with.
+                    original_name = os.path.basename(form.cleaned_data['profile_picture'].name)
+                    filename = f"{user.username}_{original_name}"
+                    enqueue_upload('profile', user.pk, user.profile_picture.path, filename, folder_id)
             except Exception as e:
-                messages.warning(request, f"Profile saved but Drive upload failed: {e}")
+                messages.warning(request, f"Profile saved but Drive upload could not be queued: {e}")
             messages.success(request, 'Account created. Please log in.')
             return redirect('login')
     else:
@@ -52,22 +71,55 @@ def logout_view(request):
     return redirect('login')
 
 
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _encode_cursor(media_req):
+    """Encode a request's (created_at, id) keyset position as '<microseconds>-<id>'."""
+    micros = (media_req.created_at - EPOCH) // timedelta(microseconds=1)
+    return f"{micros}-{media_req.pk}"
+
+
+def _decode_cursor(cursor):
+    """Return (created_at, id) for a cursor, or None if it is missing or malformed."""
+    try:
+        micros, pk = cursor.split('-', 1)
+        return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
 @login_required
 def dashboard(request):
     user = request.user
-    requests_qs = MediaRequest.objects.filter(user=user).order_by('-created_at')
+    rendered_at = timezone.now()
+    page_size = settings.DASHBOARD_PAGE_SIZE
+    requests_qs = MediaRequest.objects.filter(user=user).order_by('-created_at', '-id')
+
+    # Keyset pagination: continue strictly after the last (created_at, id) shown.
+    position = _decode_cursor(request.GET.get('after'))
+    if position:
+        created_at, pk = position
+        requests_qs = requests_qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
 
-    # Attach Google Drive links (if available)
-    requests_with_files = []
-    for r in requests_qs:
-        drive_link = r.get_drive_file_link()
-        requests_with_files.append((r, drive_link))
+    page = list(requests_qs[:page_size + 1])
+    next_cursor = _encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+    page = page[:page_size]
+
+    # Attach Google Drive links (if available) from a single folder listing
+    requests_with_files = MediaRequest.with_drive_links(page)
 
     return render(
         request,
         'dashboard.html',
         {
-            'requests_with_files': requests_with_files
+            'requests_with_files': requests_with_files,
+            'stats': MediaRequest.stats_for_user(user.pk),
+            'next_cursor': next_cursor,
+            'is_first_page': position is None,
+            # The page polls the status API for rows changed after this instant.
+            'rendered_at': rendered_at.isoformat(),
+            'poll_seconds': settings.DASHBOARD_POLL_SECONDS,
         }
     )
 
@@ -81,25 +133,46 @@ def request_create(request):
             media_req.user = request.user
             media_req.customer_name = request.user.username   # auto-fill
             media_req.customer_email = request.user.email     # auto-fill
+
+            # Without a local copy, the uploaded file is streamed straight to Drive below.
+            streamed_image = None
+            if not settings.KEEP_LOCAL_REFERENCE_IMAGES and media_req.reference_image:
+                streamed_image = form.cleaned_data['reference_image']
+                media_req.reference_image = None
             try:
                 media_req.save()
             except Exception:
                 form.add_error(None, 'You already have a request for the same date, time and location.')
                 return render(request, 'request_form.html', {'form': form})
 
-            # upload reference image to drive folder if configured
+            # send the reference image to the drive folder if configured: streamed now, or
+            # queued for the upload worker, which writes reference_image_drive_id back
             try:
-                settings_obj = SiteSetting.objects.first()
+                settings_obj = SiteSetting.load()
                 folder_link = settings_obj.drive_reference_folder or settings.GDRIVE_REFERENCE_FOLDER_ID if settings_obj else settings.GDRIVE_REFERENCE_FOLDER_ID
                 folder_id = extract_folder_id(folder_link)
-                if media_req.reference_image and folder_id:
-                    local_path = media_req.reference_image.path
-                    filename = f"{media_req.request_number}_{os.path.basename(local_path)}"
-                    drive_id = upload_file_to_drive(local_path, filename, folder_id)
+                if streamed_image:
+                    if not folder_id:
+                        raise ValueError('no reference folder is configured')
+                    digest = content_digest(streamed_image)
+                    filename = f"{media_req.request_number}_{os.path.basename(streamed_image.name)}"
+                    drive_id = copy_existing(digest, filename, folder_id)
+                    if not drive_id:
+                        drive_id = create_drive_file_from_stream(
+                            streamed_image, filename, folder_id, mimetype=streamed_image.content_type
+                        )
+                        DriveBlob.remember(digest, folder_id, drive_id)
                     media_req.reference_image_drive_id = drive_id
                     media_req.save(update_fields=['reference_image_drive_id'])
+                elif media_req.reference_image and folder_id:
+                    original_name = os.path.basename(form.cleaned_data['reference_image'].name)
+                    filename = f"{media_req.request_number}_{original_name}"
+                    enqueue_upload('reference', media_req.pk, media_req.reference_image.path, filename, folder_id)
             except Exception as e:
-                messages.warning(request, f"Uploaded locally, but Drive upload failed: {e}")
+                if streamed_image:
+                    messages.warning(request, f"Request saved, but the reference image could not be sent to Drive: {e}")
+                else:
+                    messages.warning(request, f"Uploaded locally, but Drive upload could not be queued: {e}")
 
             messages.success(request, f"Request sent successfully. Your request number is {media_req.request_number}.")
             return redirect('dashboard')
@@ -107,3 +180,137 @@ def request_create(request):
         form = MediaRequestForm(user=request.user)  # pass user here too
 
     return render(request, 'request_form.html', {'form': form})
+
+
+@login_required
+def request_receipt(request, request_number):
+    """Serve a request's PDF receipt from the on-disk cache, rendering it if the request changed."""
+    requests_qs = MediaRequest.objects.all() if request.user.is_staff else MediaRequest.objects.filter(user=request.user)
+    media_req = get_object_or_404(requests_qs, request_number=request_number)
+    return FileResponse(open_receipt(media_req), content_type='application/pdf',
+                        filename=f"receipt_{request_number}.pdf")
+
+
+STATUS_FIELDS = ('request_number', 'status', 'result_file_id', 'result_file_name', 'created_at', 'updated_at')
+
+
+def _status_json(media_req, drive_link):
+    return {
+        'request_number': media_req.request_number,
+        'status': media_req.status,
+        'result_url': drive_link,
+        'receipt_url': reverse('request_receipt', args=[media_req.request_number]),
+        'updated_at': media_req.updated_at.isoformat(),
+    }
+
+
+def _conditional_json(request, etag, last_modified, build):
+    """Return 304 while the client's validators still match, else ``build()`` as JSON, with validators attached."""
+    # HTTP dates have whole-second precision; the ETag carries the microseconds.
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = JsonResponse(build())
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _api_login_required(view):
+    """login_required for JSON endpoints: answer 401 instead of redirecting to the login page."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required.'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@require_safe
+@_api_login_required
+def requests_status(request):
+    """JSON status of the user's requests (newest first, or only those changed after ?updated_since=).
+
+    The validators come from one aggregate over the (user, updated_at) index;
+    the count is part of the ETag so deletions change it too. Result links
+    read from the Drive folder index do not touch updated_at, so the ETag
+    also carries that index's version and ?updated_since= then includes the
+    unsynced rows. Unchanged polls cost the aggregate, a cache read and a 304.
+    """
+    try:
+        since = parse_datetime(request.GET['updated_since']) if request.GET.get('updated_since') else None
+        if request.GET.get('updated_since') and since is None:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'error': 'updated_since must be an ISO 8601 timestamp.'}, status=400)
+    if since and timezone.is_naive(since):
+        since = timezone.make_aware(since, dt_timezone.utc)
+    try:
+        limit = min(max(1, int(request.GET.get('limit', settings.DASHBOARD_PAGE_SIZE))), settings.STATUS_API_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer.'}, status=400)
+
+    requests_qs = MediaRequest.objects.filter(user=request.user)
+    summary = requests_qs.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+    last_modified = summary['last_modified']
+    micros = (last_modified - EPOCH) // timedelta(microseconds=1) if last_modified else 0
+    unsynced = requests_qs.filter(result_file_id='')
+    links_version = MediaRequest.drive_links_version(
+        unsynced.order_by().annotate(day=Substr('request_number', 1, 9)).values_list('day', flat=True).distinct()
+    )
+    etag = f'W/"{summary["count"]}-{micros}-{links_version}"' if links_version else f'W/"{summary["count"]}-{micros}"'
+
+    def build():
+        rows = requests_qs.only(*STATUS_FIELDS)
+        if since:
+            changed = Q(updated_at__gt=since) | Q(result_file_id='') if links_version else Q(updated_at__gt=since)
+            rows = rows.filter(changed).order_by('-updated_at')
+        else:
+            rows = rows.order_by('-created_at', '-id')
+        return {
+            'requests': [_status_json(r, link) for r, link in MediaRequest.with_drive_links(rows[:limit])],
+            'stats': MediaRequest.stats_for_user(request.user.pk),
+        }
+
+    # Last-Modified cannot express a change in the index, so only the ETag validates then.
+    return _conditional_json(request, etag, None if links_version else last_modified, build)
+
+
+@require_safe
+@_api_login_required
+def request_status(request, request_number):
+    """JSON status of one request; the ETag is its updated_at (plus the folder index version until a result is synced)."""
+    requests_qs = MediaRequest.objects.all() if request.user.is_staff else MediaRequest.objects.filter(user=request.user)
+    media_req = get_object_or_404(requests_qs.only(*STATUS_FIELDS), request_number=request_number)
+    micros = (media_req.updated_at - EPOCH) // timedelta(microseconds=1)
+    links_version = '' if media_req.result_file_id else MediaRequest.drive_links_version([media_req.request_number])
+    return _conditional_json(
+        request, f'W/"{micros}-{links_version}"' if links_version else f'W/"{micros}"',
+        None if links_version else media_req.updated_at,
+        lambda: _status_json(*MediaRequest.with_drive_links([media_req])[0]),
+    )
+
+
+@require_safe
+def serve_media(request, name):
+    """Serve an upload or thumbnail to its owner (or staff) with ETags, long-lived caching and Range support."""
+    try:
+        path = default_storage.path(name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    if not media.can_read(request.user, media.source_names(name, settings.MEDIA_ROOT, request.user)):
+        raise Http404
+    return media.media_response(request, name, path)
+
+
+def metrics_view(request):
+    """Prometheus text exposition of this worker's request and Drive histograms (staff or token only)."""
+    auth = request.headers.get('Authorization', '')
+    token_ok = bool(settings.METRICS_TOKEN) and constant_time_compare(auth, f"Bearer {settings.METRICS_TOKEN}")
+    if not token_ok and not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,39 @@
+# core/warmup.py
+
+import os
+from django.db import connections
+from django.template import TemplateDoesNotExist, engines
+from django.urls import get_resolver
+
+
+def _template_names():
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            for dirpath, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    if filename.endswith('.html'):
+                        yield engine, os.path.relpath(os.path.join(dirpath, filename), directory)
+
+
+def warm_up():
+    """Load what every worker would otherwise load on its first requests.
+
+    Called once in a pre-forking master (see gunicorn.conf.py) so workers
+    start with it already in (copy-on-write) memory.
+    """
+    from core import google_drive
+    google_drive.warm_up()
+    # Heavy optional dependencies imported lazily by the export and receipt code.
+    import fpdf  # noqa: F401
+    import openpyxl  # noqa: F401
+
+    resolver = get_resolver()
+    resolver.reverse_dict  # noqa: B018 - populates the reverse lookup tables
+    for engine, name in _template_names():
+        try:
+            engine.get_template(name)
+        except TemplateDoesNotExist:
+            pass
+
+    # Never hand an open database connection to forked workers.
+    connections.close_all()
@@ -0,0 +1,13 @@
+# gunicorn.conf.py -- picked up by `gunicorn -c gunicorn.conf.py wsgi:application` (see Procfile).
+# Bind address and worker count still come from gunicorn's PORT / WEB_CONCURRENCY defaults.
+
+# Import Django and the app once in the master; workers are forked with it loaded.
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported and before any worker is forked.
+    from core.warmup import warm_up
+
+    warm_up()
+    server.log.info("Warm-up done: Drive client, URL resolver and templates loaded.")